@@ -1,23 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from pydantic import BaseModel
 from typing import List, Optional
+import anyio
 import json
+import logging
+import re
 import uuid
 
-from app.db.database import get_db
-from app.services.ai_service import AIService
+from app.db import data_version
+from app.db.database import get_async_db, get_async_read_db, AsyncSessionLocal
+from app.services.ai_service import AIService, FINANCIAL_SECTIONS
+from app.services.generation_scheduler import generation_scheduler, QueueFull
+from app.services.response_cache import response_cache
+from app.services.categorizer import categorizer, preload as preload_categorizer
+from app.services import action_executor, conversation_memory, fast_path, model_warmup
 from app.models.chat import (
     RAGChatSession, RAGChatMessage,
     AvatarChatSession, AvatarChatMessage,
     DashboardChatSession, DashboardChatMessage
 )
-from app.schemas.chat import ChatSession as ChatSessionSchema, ChatMessage as ChatMessageSchema, ChatSessionCreate, ChatSessionUpdate
+from app.schemas.chat import ChatSession as ChatSessionSchema, ChatMessage as ChatMessageSchema, ChatSessionCreate, ChatSessionUpdate, ChatSessionSummaryPage, ChatMessagePage, ContextCacheStats, ContextReport, GenerationQueueStats, ResponseCacheStats, ModelLatencyReport, FastPathStats, ChatSummary as ChatSummarySchema, ConversationMemoryStats
+from app.utils.cursor import encode_cursor, decode_cursor
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 ai_service = AIService()
 
+PREVIEW_LENGTH = 120
+
 class ChatRequest(BaseModel):
     message: str
     mode: str = "chat" # This is for AI behavior (e.g. chat vs implementation)
@@ -31,98 +45,377 @@ def get_chat_models(section: str):
     else: # Default to RAG
         return RAGChatSession, RAGChatMessage
 
+def history_query(MessageModel, session_id: str, limit: int, before: Optional[str] = None, exclude_id: Optional[str] = None):
+    """Newest-first page of a session's messages, served by the (session_id, created_at) index"""
+    query = select(MessageModel).where(MessageModel.session_id == session_id)
+    if exclude_id is not None:
+        query = query.where(MessageModel.id != exclude_id)
+    if before:
+        created_at, message_id = decode_cursor(before)
+        # Row-value comparison so the planner seeks the index instead of scanning it
+        query = query.where(tuple_(MessageModel.created_at, MessageModel.id) < (created_at, message_id))
+    return query.order_by(MessageModel.created_at.desc(), MessageModel.id.desc()).limit(limit)
+
 # --- Sessions ---
 
+# Lazy loads are not allowed on async sessions, so `messages` is always loaded explicitly
+
 @router.get("/sessions", response_model=List[ChatSessionSchema])
-def get_sessions(section: str = Query("rag"), db: Session = Depends(get_db)):
+async def get_sessions(section: str = Query("rag"), db: AsyncSession = Depends(get_async_read_db)):
     SessionModel, _ = get_chat_models(section)
-    return db.query(SessionModel).order_by(SessionModel.updated_at.desc()).all()
+    result = await db.scalars(
+        select(SessionModel).options(selectinload(SessionModel.messages)).order_by(SessionModel.updated_at.desc())
+    )
+    return result.all()
+
+@router.get("/sessions/summary", response_model=ChatSessionSummaryPage)
+async def get_session_summaries(
+    section: str = Query("rag"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Sidebar listing: counts and last-message preview from one query, newest first, no message bodies"""
+    SessionModel, MessageModel = get_chat_models(section)
+
+    def last_message(column):
+        return (
+            select(column)
+            .where(MessageModel.session_id == SessionModel.id)
+            .order_by(MessageModel.created_at.desc())
+            .limit(1)
+            .correlate(SessionModel)
+            .scalar_subquery()
+        )
+
+    message_count = (
+        select(func.count(MessageModel.id))
+        .where(MessageModel.session_id == SessionModel.id)
+        .correlate(SessionModel)
+        .scalar_subquery()
+    )
+    query = select(
+        SessionModel.id,
+        SessionModel.title,
+        SessionModel.created_at,
+        SessionModel.updated_at,
+        message_count.label("message_count"),
+        last_message(MessageModel.role).label("last_message_role"),
+        last_message(func.substr(MessageModel.content, 1, PREVIEW_LENGTH)).label("last_message_preview"),
+    )
+    if cursor:
+        updated_at, session_id = decode_cursor(cursor)
+        query = query.where(tuple_(SessionModel.updated_at, SessionModel.id) < (updated_at, session_id))
+    query = query.order_by(SessionModel.updated_at.desc(), SessionModel.id.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+    return {"items": rows, "next_cursor": next_cursor}
 
 @router.post("/sessions", response_model=ChatSessionSchema)
-def create_session(session: ChatSessionCreate, section: str = Query("rag"), db: Session = Depends(get_db)):
+async def create_session(session: ChatSessionCreate, section: str = Query("rag"), db: AsyncSession = Depends(get_async_db)):
     SessionModel, _ = get_chat_models(section)
-    db_session = SessionModel(title=session.title)
+    db_session = SessionModel(title=session.title, messages=[])
     db.add(db_session)
-    db.commit()
-    db.refresh(db_session)
+    await db.commit()
     return db_session
 
 @router.patch("/sessions/{session_id}", response_model=ChatSessionSchema)
-def update_session(session_id: str, session: ChatSessionUpdate, section: str = Query("rag"), db: Session = Depends(get_db)):
+async def update_session(session_id: str, session: ChatSessionUpdate, section: str = Query("rag"), db: AsyncSession = Depends(get_async_db)):
     SessionModel, _ = get_chat_models(section)
-    db_session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+    db_session = await db.get(SessionModel, session_id, options=[selectinload(SessionModel.messages)])
     if not db_session:
         raise HTTPException(status_code=404, detail="Session not found")
     
     db_session.title = session.title
-    db.commit()
-    db.refresh(db_session)
+    await db.commit()
     return db_session
 
 @router.delete("/sessions/{session_id}", status_code=204)
-def delete_session(session_id: str, section: str = Query("rag"), db: Session = Depends(get_db)):
+async def delete_session(session_id: str, section: str = Query("rag"), db: AsyncSession = Depends(get_async_db)):
     SessionModel, _ = get_chat_models(section)
-    db_session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+    db_session = await db.get(SessionModel, session_id, options=[selectinload(SessionModel.messages)])
     if not db_session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    db.delete(db_session)
-    db.commit()
+    await db.delete(db_session)
+    await conversation_memory.delete_summary(db, section, session_id)
+    await db.commit()
     return
 
 @router.get("/sessions/{session_id}/messages", response_model=List[ChatMessageSchema])
-def get_messages(session_id: str, section: str = Query("rag"), db: Session = Depends(get_db)):
+async def get_messages(session_id: str, section: str = Query("rag"), db: AsyncSession = Depends(get_async_read_db)):
     SessionModel, MessageModel = get_chat_models(section)
     # Verify session exists in this section
-    session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+    session = await db.get(SessionModel, session_id)
+    if not session:
+         raise HTTPException(status_code=404, detail="Session not found")
+
+    result = await db.scalars(
+        select(MessageModel).filter(MessageModel.session_id == session_id).order_by(MessageModel.created_at)
+    )
+    return result.all()
+
+@router.get("/sessions/{session_id}/messages/page", response_model=ChatMessagePage)
+async def get_messages_page(
+    session_id: str,
+    section: str = Query("rag"),
+    before: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Load history backwards for infinite scroll. Items are chronological; pass `next_before` to go further back."""
+    SessionModel, MessageModel = get_chat_models(section)
+    session = await db.get(SessionModel, session_id)
     if not session:
          raise HTTPException(status_code=404, detail="Session not found")
 
-    return db.query(MessageModel).filter(MessageModel.session_id == session_id).order_by(MessageModel.created_at).all()
+    messages = (await db.scalars(history_query(MessageModel, session_id, limit + 1, before))).all()
+    next_before = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_before = encode_cursor(messages[-1].created_at, messages[-1].id)
+    return {"items": messages[::-1], "next_before": next_before}
+
+@router.get("/sessions/{session_id}/summary", response_model=ChatSummarySchema)
+async def get_session_summary(session_id: str, section: str = Query("rag"), db: AsyncSession = Depends(get_async_read_db)):
+    """The rolling summary that stands in for turns no longer sent to the model"""
+    SessionModel, _ = get_chat_models(section)
+    session = await db.get(SessionModel, session_id)
+    if not session:
+         raise HTTPException(status_code=404, detail="Session not found")
+
+    summary = await conversation_memory.get_summary(db, section, session_id)
+    if summary is None:
+        return {"session_id": session_id, "content": "", "message_count": 0}
+    return summary
 
 # --- Chat ---
 
+@router.get("/context/stats", response_model=ContextCacheStats)
+def get_context_stats():
+    """Hit/miss counts for the cached financial context"""
+    return ai_service.get_context_stats()
+
+@router.get("/queue", response_model=GenerationQueueStats)
+def get_queue_stats():
+    """Running/waiting generations and admission counters"""
+    return generation_scheduler.snapshot()
+
+@router.get("/latency", response_model=ModelLatencyReport)
+def get_latency_report():
+    """Time to first token before/after model warm-up, and the warm-up results"""
+    return {
+        **ai_service.get_latency_stats(),
+        "last_warmup_at": model_warmup.status["last_run_at"],
+        "warmup": model_warmup.status["models"],
+    }
+
+@router.post("/warmup", response_model=ModelLatencyReport)
+async def warm_up_models():
+    """Load the chat model(s) into Ollama now and prime the static prompt prefix"""
+    await model_warmup.warm_up(ai_service)
+    return get_latency_report()
+
+@router.get("/memory", response_model=ConversationMemoryStats)
+def get_memory_stats():
+    """History budget and background summarisation counters"""
+    return conversation_memory.snapshot()
+
+@router.get("/fast-path", response_model=FastPathStats)
+def get_fast_path_stats():
+    """Share of dashboard/avatar chat messages answered without the LLM"""
+    return fast_path.snapshot()
+
+@router.get("/response-cache", response_model=ResponseCacheStats)
+def get_response_cache_stats():
+    return response_cache.snapshot()
+
+@router.delete("/response-cache", status_code=204)
+def clear_response_cache():
+    response_cache.clear()
+
+@router.get("/context/report", response_model=ContextReport)
+async def get_context_report(section: str = Query("dashboard"), message: str = "", db: AsyncSession = Depends(get_async_db)):
+    """Estimated prompt tokens per context section for a given message"""
+    _, report = await db.run_sync(ai_service.build_context_with_report, section, message)
+    return {"total_tokens": sum(s["tokens"] for s in report), "sections": report}
+
+async def ensure_categorizer():
+    # Tokenizing the whole ledger is CPU work; do it in a worker thread, never on the event loop
+    if not categorizer.loaded:
+        await anyio.to_thread.run_sync(preload_categorizer)
+
+def sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+class SlotStreamingResponse(StreamingResponse):
+    """Gives the generation slot back however the response ends.
+
+    The body generator's own cleanup only runs once iteration has started; this also
+    covers a client that is gone before the first chunk (release is idempotent).
+    """
+
+    def __init__(self, content, ticket, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            generation_scheduler.release(self.ticket)
+
 @router.post("/chat/{session_id}")
-async def chat(session_id: str, request: ChatRequest, section: str = Query("rag"), db: Session = Depends(get_db)):
+async def chat(
+    session_id: str,
+    request: ChatRequest,
+    http_request: Request,
+    section: str = Query("rag"),
+    db: AsyncSession = Depends(get_async_db),
+):
     SessionModel, MessageModel = get_chat_models(section)
 
     # Verify session exists
-    session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
+    session = await db.get(SessionModel, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    # Save User Message
-    user_msg = MessageModel(session_id=session_id, role="user", content=request.message)
-    db.add(user_msg)
-    db.commit()
+    async def save_user_message():
+        user_msg = MessageModel(session_id=session_id, role="user", content=request.message)
+        db.add(user_msg)
+        await db.commit()
+        return user_msg
 
-    # Fetch recent history for context (last 10 messages, excluding current user msg)
-    history = db.query(MessageModel).filter(
-        MessageModel.session_id == session_id,
-        MessageModel.id != user_msg.id
-    ).order_by(MessageModel.created_at.desc()).limit(10).all()
-    history = history[::-1] # Reverse to chronological order
+    async def save_reply(content: str):
+        # The request's session is closed once the response starts, so persist with our own
+        async with AsyncSessionLocal() as stream_db:
+            assistant_msg = MessageModel(session_id=session_id, role="assistant", content=content)
+            stream_db.add(assistant_msg)
+            await stream_db.flush()
 
-    def event_generator():
-        full_response = ""
-        try:
-            # Pass section and history to AI service
-            for chunk in ai_service.generate_stream(request.message, db, section, history):
-                full_response += chunk
-                payload = json.dumps({"content": chunk})
-                yield f"data: {payload}\n\n"
-            
-            # Save Assistant Message after stream completes
-            assistant_msg = MessageModel(session_id=session_id, role="assistant", content=full_response)
-            db.add(assistant_msg)
-            db.commit()
-            
             # Update session timestamp
-            session.updated_at = assistant_msg.created_at
-            db.commit()
+            await stream_db.execute(
+                update(SessionModel).where(SessionModel.id == session_id).values(updated_at=assistant_msg.created_at)
+            )
+            await stream_db.commit()
+
+    async def run_action(action: dict) -> dict:
+        await ensure_categorizer()
+        async with AsyncSessionLocal() as action_db:
+            return await action_db.run_sync(action_executor.execute, action)
+
+    # Simple ledger commands ("add food 100") are executed directly, without the LLM.
+    # The grammar runs first; categories are only loaded for messages that parse as a command.
+    if section.lower() in FINANCIAL_SECTIONS and request.mode == "chat":
+        command = fast_path.parse(request.message)
+        action = None
+        if command is not None:
+            context_data = await db.run_sync(ai_service.get_context_data)
+            await ensure_categorizer()
+            action = fast_path.resolve(command, context_data["categories"])
+        fast_path.record(action is not None)
+        if action is not None:
+            await save_user_message()
+            result = await run_action(action)
+            answer = fast_path.reply(action, result)
 
+            async def fast_path_generator():
+                for chunk in re.findall(r"\s*\S+", answer):
+                    yield sse({"content": chunk})
+                yield f"event: action_result\n{sse({'action_result': result})}"
+                await save_reply(answer)
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(fast_path_generator(), media_type="text/event-stream", headers={"X-Fast-Path": "hit"})
+
+    # Repeated read-only questions are answered from the cache, without a generation slot.
+    # Keys don't cover chat history, so only a session's opening question in the financial
+    # sections is looked up or stored. The key carries the data version seen *before* the context is built.
+    cache_key = None
+    if section.lower() in FINANCIAL_SECTIONS:
+        earlier = await db.scalar(select(MessageModel.id).where(MessageModel.session_id == session_id).limit(1))
+        if earlier is None:
+            cache_key = response_cache.key(request.message, section, data_version.current(), ai_service.model, request.mode)
+    cached_answer = response_cache.get(cache_key) if cache_key is not None else None
+    if cached_answer is not None:
+        await save_user_message()
+
+        async def replay_generator():
+            for chunk in re.findall(r"\s*\S+", cached_answer):
+                yield sse({"content": chunk, "cached": True})
+            await save_reply(cached_answer)
             yield "data: [DONE]\n\n"
+
+        return StreamingResponse(replay_generator(), media_type="text/event-stream", headers={"X-Response-Cache": "hit"})
+
+    # Admission control: reject fast when the queue is full, before anything is saved
+    try:
+        ticket = generation_scheduler.submit((section, session_id))
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    try:
+        # Save User Message
+        user_msg = await save_user_message()
+
+        # Rolling summary plus the recent turns that fit the history budget (excluding current user msg)
+        memory = await conversation_memory.load(db, MessageModel, section, session_id, exclude_id=user_msg.id)
+
+        # build_context is written against a sync Session; run it on the async connection
+        system_context = await db.run_sync(ai_service.build_context, section, request.message)
+    except BaseException:
+        generation_scheduler.release(ticket)
+        raise
+
+    async def event_generator():
+        full_response = ""
+        saved = False
+        stream = ai_service.astream_chat(system_context, request.message, memory["history"], memory["summary"])
+        # Only these sections are told how to emit actions
+        actions = action_executor.ActionBlockParser() if section.lower() in FINANCIAL_SECTIONS else None
+        try:
+            # Tell the client where it stands while it waits for a generation slot
+            async for position in generation_scheduler.wait(ticket):
+                if await http_request.is_disconnected():
+                    return
+                yield sse({"queue_position": position})
+
+            async for chunk in stream:
+                full_response += chunk
+                if await http_request.is_disconnected():
+                    break
+                yield sse({"content": chunk})
+                # Execute each action as soon as its block closes, while the model keeps talking
+                for action in actions.feed(chunk) if actions else ():
+                    result = await run_action(action)
+                    yield f"event: action_result\n{sse({'action_result': result})}"
+            else:
+                await save_reply(full_response)
+                saved = True
+                if memory["needs_compaction"]:
+                    # Fold older turns into the summary after this reply, off the request path
+                    conversation_memory.schedule(ai_service, MessageModel, section, session_id)
+                # Only complete answers without an action block are kept
+                if cache_key is not None:
+                    response_cache.put(cache_key, full_response)
+                yield "data: [DONE]\n\n"
         except Exception as e:
             yield f"data: {{\"error\": \"{str(e)}\"}}\n\n"
+        finally:
+            # Runs on completion, on a disconnect noticed between chunks, and when the
+            # server cancels the response task. Shielded so the cleanup itself is not cancelled.
+            with anyio.CancelScope(shield=True):
+                await stream.aclose()  # drops the upstream request so Ollama stops generating
+                generation_scheduler.release(ticket)
+                if not saved and full_response:
+                    logger.info("Chat %s ended early; saving partial reply (%d chars)", session_id, len(full_response))
+                    await save_reply(full_response)
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return SlotStreamingResponse(
+        event_generator(), ticket, media_type="text/event-stream",
+        headers={"X-Response-Cache": "miss" if cache_key is not None else "bypass"},
+    )
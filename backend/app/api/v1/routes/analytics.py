@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+import datetime
+
+from app.db.database import get_read_db
+from app.schemas.analytics import RangeSum, CategoryBreakdown, MonthBreakdown, TopTransaction, SnapshotStats, CashFlowForecast
+from app.services import forecast_service
+from app.services.ledger_snapshot import ledger_snapshot
+
+router = APIRouter()
+
+@router.get("/sum", response_model=RangeSum)
+def range_sum(start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None, db: Session = Depends(get_read_db)):
+    ledger_snapshot.ensure_loaded(db)
+    return ledger_snapshot.range_sum(start, end)
+
+@router.get("/by-category", response_model=List[CategoryBreakdown])
+def by_category(start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None, db: Session = Depends(get_read_db)):
+    ledger_snapshot.ensure_loaded(db)
+    return ledger_snapshot.by_category(start, end)
+
+@router.get("/by-month", response_model=List[MonthBreakdown])
+def by_month(start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None, db: Session = Depends(get_read_db)):
+    ledger_snapshot.ensure_loaded(db)
+    return ledger_snapshot.by_month(start, end)
+
+@router.get("/top", response_model=List[TopTransaction])
+def top_transactions(
+    n: int = Query(10, ge=1, le=1000),
+    kind: Literal["expense", "income"] = "expense",
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    db: Session = Depends(get_read_db),
+):
+    ledger_snapshot.ensure_loaded(db)
+    return ledger_snapshot.top(n, kind, start, end)
+
+@router.get("/forecast", response_model=CashFlowForecast)
+def cash_flow_forecast(
+    months: int = Query(12, ge=1, le=60),
+    granularity: Literal["daily", "monthly"] = "daily",
+    trailing_days: int = Query(90, ge=0, le=730, description="Days of history for average discretionary spend; 0 disables it"),
+    db: Session = Depends(get_read_db),
+):
+    """Projected balance from today's balance, recurring rules and future-dated transactions"""
+    return forecast_service.forecast(db, months, granularity, trailing_days)
+
+@router.get("/snapshot", response_model=SnapshotStats)
+def snapshot_stats():
+    """Memory accounting for the in-process ledger snapshot"""
+    return ledger_snapshot.memory_stats()
+
+@router.post("/snapshot/rebuild", response_model=SnapshotStats)
+def rebuild_snapshot(db: Session = Depends(get_read_db)):
+    ledger_snapshot.rebuild(db)
+    return ledger_snapshot.memory_stats()
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
+import time
 import uuid
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.models.category import Category as CategoryModel
-from app.schemas.category import Category, CategoryCreate, CategoryUpdate
+from app.schemas.category import Category, CategoryCreate, CategoryUpdate, CategorySuggestions, CategorizerStats
+from app.services.categorizer import categorizer
 
 router = APIRouter()
 
@@ -18,12 +20,33 @@ def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
     return db_category
 
 @router.get("/", response_model=List[Category])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     categories = db.query(CategoryModel).offset(skip).limit(limit).all()
     return categories
 
+@router.get("/suggest", response_model=CategorySuggestions)
+def suggest_category(description: str = Query(..., min_length=1), limit: int = Query(3, ge=1, le=10), db: Session = Depends(get_read_db)):
+    """Likely categories for a description, learned from existing transactions"""
+    categorizer.ensure_loaded(db)
+    started = time.perf_counter()
+    suggestions = categorizer.suggest(description, limit)
+    elapsed = time.perf_counter() - started
+
+    ids = [uuid.UUID(s["category_id"]) for s in suggestions]
+    categories = {c.id: c for c in db.query(CategoryModel).filter(CategoryModel.id.in_(ids))} if ids else {}
+    items = []
+    for suggestion, category_id in zip(suggestions, ids):
+        category = categories.get(category_id)
+        if category is not None:  # skip categories deleted since they were learned
+            items.append({**suggestion, "category_id": category.id, "name": category.name, "is_income": category.is_income})
+    return {"description": description, "suggestions": items, "lookup_microseconds": round(elapsed * 1e6, 1)}
+
+@router.get("/suggest/stats", response_model=CategorizerStats)
+def get_categorizer_stats():
+    return categorizer.snapshot()
+
 @router.get("/{category_id}", response_model=Category)
-def read_category(category_id: uuid.UUID, db: Session = Depends(get_db)):
+def read_category(category_id: uuid.UUID, db: Session = Depends(get_read_db)):
     db_category = db.query(CategoryModel).filter(CategoryModel.id == category_id).first()
     if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
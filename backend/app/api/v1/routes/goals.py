@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
 import uuid
 
-from app.db.database import get_db
-from app.models.goal import Goal as GoalModel
-from app.schemas.goal import Goal, GoalCreate, GoalUpdate
+from app.db.database import get_db, get_read_db
+from app.models.category import Category as CategoryModel
+from app.models.goal import Goal as GoalModel, GoalLink as GoalLinkModel, GoalContribution as GoalContributionModel
+from app.models.transaction import Transaction as TransactionModel
+from app.schemas.goal import Goal, GoalCreate, GoalUpdate, GoalLink, GoalLinkCreate, GoalContribution, GoalReconcileResult
+from app.services import goal_service
 
 router = APIRouter()
 
@@ -13,17 +16,26 @@ router = APIRouter()
 def create_goal(goal: GoalCreate, db: Session = Depends(get_db)):
     db_goal = GoalModel(**goal.dict())
     db.add(db_goal)
+    db.flush()
+    goal_service.record_manual(db, db_goal, db_goal.current_amount, "Opening balance")
     db.commit()
     db.refresh(db_goal)
     return db_goal
 
 @router.get("/", response_model=List[Goal])
-def read_goals(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_goals(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     goals = db.query(GoalModel).offset(skip).limit(limit).all()
     return goals
 
+@router.post("/reconcile", response_model=GoalReconcileResult)
+def reconcile_goals(db: Session = Depends(get_db)):
+    """Recompute every goal's contributions and current_amount from its links"""
+    result = goal_service.reconcile(db)
+    db.commit()
+    return result
+
 @router.get("/{goal_id}", response_model=Goal)
-def read_goal(goal_id: str, db: Session = Depends(get_db)):
+def read_goal(goal_id: str, db: Session = Depends(get_read_db)):
     db_goal = db.query(GoalModel).filter(GoalModel.id == goal_id).first()
     if db_goal is None:
         raise HTTPException(status_code=404, detail="Goal not found")
@@ -36,6 +48,10 @@ def update_goal(goal_id: str, goal: GoalUpdate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Goal not found")
     
     update_data = goal.dict(exclude_unset=True)
+    if update_data.get("current_amount") is not None:
+        # Keep current_amount equal to the sum of the contribution history
+        delta = update_data["current_amount"] - (db_goal.current_amount or 0.0)
+        goal_service.record_manual(db, db_goal, delta, "Manual adjustment")
     for key, value in update_data.items():
         setattr(db_goal, key, value)
         
@@ -49,6 +65,62 @@ def delete_goal(goal_id: str, db: Session = Depends(get_db)):
     if db_goal is None:
         raise HTTPException(status_code=404, detail="Goal not found")
     
+    goal_service.delete_goal_data(db, goal_id)
     db.delete(db_goal)
     db.commit()
     return
+
+@router.get("/{goal_id}/contributions", response_model=List[GoalContribution])
+def read_goal_contributions(
+    goal_id: str,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    """Contribution history, newest first"""
+    return (
+        db.query(GoalContributionModel)
+        .filter(GoalContributionModel.goal_id == goal_id)
+        .order_by(GoalContributionModel.date.desc(), GoalContributionModel.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+@router.get("/{goal_id}/links", response_model=List[GoalLink])
+def read_goal_links(goal_id: str, db: Session = Depends(get_read_db)):
+    return db.query(GoalLinkModel).filter(GoalLinkModel.goal_id == goal_id).all()
+
+@router.post("/{goal_id}/links", response_model=GoalLink, status_code=201)
+def create_goal_link(goal_id: str, link: GoalLinkCreate, db: Session = Depends(get_db)):
+    """Count a transaction, or every transaction in a category, towards this goal"""
+    db_goal = db.query(GoalModel).filter(GoalModel.id == goal_id).first()
+    if db_goal is None:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    if (link.transaction_id is None) == (link.category_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of transaction_id or category_id")
+
+    if link.transaction_id is not None:
+        if db.query(TransactionModel.id).filter(TransactionModel.id == link.transaction_id).first() is None:
+            raise HTTPException(status_code=404, detail="Transaction not found")
+        taken = db.query(GoalLinkModel).filter(GoalLinkModel.transaction_id == link.transaction_id).first()
+    else:
+        if db.query(CategoryModel.id).filter(CategoryModel.id == link.category_id).first() is None:
+            raise HTTPException(status_code=404, detail="Category not found")
+        taken = db.query(GoalLinkModel).filter(GoalLinkModel.category_id == link.category_id).first()
+    if taken is not None:
+        raise HTTPException(status_code=409, detail=f"Already linked to goal {taken.goal_id}")
+
+    db_link = goal_service.link(db, db_goal, link.transaction_id, link.category_id)
+    db.commit()
+    db.refresh(db_link)
+    return db_link
+
+@router.delete("/{goal_id}/links/{link_id}", status_code=204)
+def delete_goal_link(goal_id: str, link_id: str, db: Session = Depends(get_db)):
+    db_link = db.query(GoalLinkModel).filter(GoalLinkModel.id == link_id, GoalLinkModel.goal_id == goal_id).first()
+    if db_link is None:
+        raise HTTPException(status_code=404, detail="Goal link not found")
+    goal_service.unlink(db, db_link)
+    db.commit()
+    return
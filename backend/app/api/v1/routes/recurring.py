@@ -1,32 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
-import uuid
-from datetime import datetime, timedelta
-import calendar
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.models.recurring import RecurringExpense as RecurringExpenseModel
-from app.models.transaction import Transaction as TransactionModel
 from app.schemas.recurring import RecurringExpense, RecurringExpenseCreate, RecurringExpenseUpdate
+from app.services import forecast_service, ledger_events, recurring_service
 
 router = APIRouter()
 
 @router.post("/", response_model=RecurringExpense, status_code=201)
 def create_recurring_expense(recurring: RecurringExpenseCreate, db: Session = Depends(get_db)):
-    db_recurring = RecurringExpenseModel(**recurring.dict())
+    db_recurring = RecurringExpenseModel(**recurring.dict(), anchor_day=recurring.next_due_date.day)
     db.add(db_recurring)
     db.commit()
     db.refresh(db_recurring)
+    forecast_service.invalidate()
     return db_recurring
 
 @router.get("/", response_model=List[RecurringExpense])
-def read_recurring_expenses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_recurring_expenses(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     recurring_expenses = db.query(RecurringExpenseModel).offset(skip).limit(limit).all()
     return recurring_expenses
 
 @router.get("/{recurring_id}", response_model=RecurringExpense)
-def read_recurring_expense(recurring_id: str, db: Session = Depends(get_db)):
+def read_recurring_expense(recurring_id: str, db: Session = Depends(get_read_db)):
     db_recurring = db.query(RecurringExpenseModel).filter(RecurringExpenseModel.id == recurring_id).first()
     if db_recurring is None:
         raise HTTPException(status_code=404, detail="Recurring Expense not found")
@@ -39,11 +37,15 @@ def update_recurring_expense(recurring_id: str, recurring: RecurringExpenseUpdat
         raise HTTPException(status_code=404, detail="Recurring Expense not found")
     
     update_data = recurring.dict(exclude_unset=True)
+    if update_data.get("next_due_date") is not None:
+        # A due date set by hand is the new anchor for month-based rules
+        update_data["anchor_day"] = update_data["next_due_date"].day
     for key, value in update_data.items():
         setattr(db_recurring, key, value)
         
     db.commit()
     db.refresh(db_recurring)
+    forecast_service.invalidate()
     return db_recurring
 
 @router.delete("/{recurring_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -53,50 +55,20 @@ def delete_recurring_expense(recurring_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Recurring expense not found")
     db.delete(db_recurring)
     db.commit()
+    forecast_service.invalidate()
     return None
 
 @router.post("/process")
 def process_recurring_expenses(db: Session = Depends(get_db)):
     """
-    Checks for recurring expenses that are due and creates transactions for them.
-    Updates the next_due_date based on frequency.
+    Books every missed occurrence of each due recurring expense up to today and
+    moves next_due_date past today. Safe to re-run: a period is never booked twice.
     """
-    today = datetime.now().date()
-    due_expenses = db.query(RecurringExpenseModel).filter(RecurringExpenseModel.next_due_date <= today).all()
-    
-    processed_count = 0
-    
-    for expense in due_expenses:
-        # Create Transaction
-        new_transaction = TransactionModel(
-            id=str(uuid.uuid4()),
-            amount=-abs(expense.amount), # Expense is negative
-            description=f"Recurring: {expense.name}",
-            date=datetime.now(),
-            category_id=None, # Could be linked if we added category to recurring model
-            notes="Auto-generated from recurring expense"
-        )
-        db.add(new_transaction)
-        
-        # Update Next Due Date
-        current_due = expense.next_due_date
-        if expense.frequency == "Weekly":
-            expense.next_due_date = current_due + timedelta(weeks=1)
-        elif expense.frequency == "Monthly":
-            # Simple monthly increment (can be improved for end of month logic)
-            next_month = current_due.month + 1 if current_due.month < 12 else 1
-            next_year = current_due.year + 1 if current_due.month == 12 else current_due.year
-            # Handle days like 31st -> 30th/28th
-            try:
-                expense.next_due_date = current_due.replace(year=next_year, month=next_month)
-            except ValueError:
-                # Fallback to last day of next month
-                last_day = calendar.monthrange(next_year, next_month)[1]
-                expense.next_due_date = current_due.replace(year=next_year, month=next_month, day=last_day)
-        elif expense.frequency == "Yearly":
-            expense.next_due_date = current_due.replace(year=current_due.year + 1)
-            
-        processed_count += 1
-        
+    result = recurring_service.process_due(db)
     db.commit()
-    return {"message": f"Processed {processed_count} recurring expenses"}
+    ledger_events.committed(added=result["added"])
+    return {
+        "message": f"Processed {result['rules']} recurring expenses",
+        "created": result["created"],
+        "skipped": result["skipped"],
+    }
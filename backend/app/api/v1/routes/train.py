@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from fastapi.responses import StreamingResponse
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from typing import List
 import os
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.models.training_job import TrainingJob, JobStatus
 from app.schemas.training import (
     TrainingJobCreate,
@@ -79,13 +80,13 @@ def create_training_job(job: TrainingJobCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/jobs", response_model=List[TrainingJobResponse])
-def get_training_jobs(db: Session = Depends(get_db)):
+def get_training_jobs(db: Session = Depends(get_read_db)):
     """Get all training jobs"""
     jobs = db.query(TrainingJob).order_by(TrainingJob.created_at.desc()).all()
     return jobs
 
 @router.get("/jobs/{job_id}", response_model=TrainingJobResponse)
-def get_training_job(job_id: str, db: Session = Depends(get_db)):
+def get_training_job(job_id: str, db: Session = Depends(get_read_db)):
     """Get specific training job"""
     job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
     if not job:
@@ -106,7 +107,7 @@ def start_training_job(job_id: str, db: Session = Depends(get_db)):
         )
     
     try:
-        training_service.start_training(job_id, db)
+        training_service.start_training(job_id)
         return {"message": "Training started", "job_id": job_id}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -136,7 +137,7 @@ def stop_training_job(job_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Failed to stop training")
 
 @router.get("/jobs/{job_id}/stream")
-def stream_training_progress(job_id: str, db: Session = Depends(get_db)):
+def stream_training_progress(job_id: str, db: Session = Depends(get_read_db)):
     """Stream training progress using Server-Sent Events"""
     job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
     if not job:
@@ -168,20 +169,30 @@ def delete_training_job(job_id: str, db: Session = Depends(get_db)):
     return
 
 @router.get("/models")
-def get_models(db: Session = Depends(get_db)):
+def get_models(db: Session = Depends(get_read_db)):
     """Get all trained models"""
     models = training_service.get_available_models()
     
+    # Extract job_id prefix from model name (format: finance-ai-{job_id[:8]})
+    prefixes = {
+        model['name']: model['name'].split('finance-ai-')[1]
+        for model in models
+        if 'finance-ai-' in model['name']
+    }
+
+    # One query for every model's job instead of one per model
+    jobs = []
+    if prefixes:
+        jobs = db.query(TrainingJob).filter(
+            or_(*[TrainingJob.id.like(f"{prefix}%") for prefix in set(prefixes.values())])
+        ).all()
+
     # Enrich with job information
     result = []
     for model in models:
         model_name = model['name']
-        # Extract job_id from model name (format: finance-ai-{job_id[:8]})
-        if 'finance-ai-' in model_name:
-            job_id_prefix = model_name.split('finance-ai-')[1]
-            job = db.query(TrainingJob).filter(
-                TrainingJob.id.like(f"{job_id_prefix}%")
-            ).first()
+        if model_name in prefixes:
+            job = next((j for j in jobs if j.id.startswith(prefixes[model_name])), None)
             
             result.append({
                 "id": model_name,
@@ -1,41 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
 import uuid
 import csv
 import io
+import os
 
-from app.db.database import get_db
+from app.db.database import get_db, get_async_db, get_async_read_db
 from app.models.transaction import Transaction as TransactionModel
-from app.schemas.transaction import Transaction, TransactionCreate, TransactionUpdate
+from app.schemas.transaction import Transaction, TransactionCreate, TransactionUpdate, TransactionSummary, TransactionPage, BulkImportResult, TransactionSearchPage, TransactionBatchRequest, TransactionBatchResult
+from app.services import rollup_service, csv_import_service, export_service, search_service, ledger_events, transaction_batch_service
+from app.services.transaction_query import TransactionFilters, ordered, after_cursor, encode_cursor
 
 router = APIRouter()
 
 @router.post("/", response_model=Transaction, status_code=201)
-def create_transaction(transaction: TransactionCreate, db: Session = Depends(get_db)):
+async def create_transaction(transaction: TransactionCreate, db: AsyncSession = Depends(get_async_db)):
     # Convert amount from major to minor units (e.g., dollars to cents)
     # transaction.amount = int(transaction.amount * 100)
     db_transaction = TransactionModel(**transaction.dict())
     db.add(db_transaction)
-    db.commit()
-    db.refresh(db_transaction)
+    await db.run_sync(ledger_events.apply, added=[db_transaction])
+    await db.commit()
+    await db.refresh(db_transaction)
+    ledger_events.committed(added=[db_transaction])
     return db_transaction
 
 @router.get("/", response_model=List[Transaction])
-def read_transactions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    transactions = db.query(TransactionModel).offset(skip).limit(limit).all()
+async def read_transactions(skip: int = 0, limit: int = 100, filters: TransactionFilters = Depends(), db: AsyncSession = Depends(get_async_read_db)):
+    query = ordered(filters.apply(select(TransactionModel)))
+    transactions = (await db.scalars(query.offset(skip).limit(limit))).all()
     return transactions
 
+@router.get("/page", response_model=TransactionPage)
+async def read_transactions_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    order: Literal["desc", "asc"] = "desc",
+    filters: TransactionFilters = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Keyset-paginated listing ordered by (date, id). Pass back `next_cursor` to get the next page."""
+    query = after_cursor(filters.apply(select(TransactionModel)), cursor, order)
+    transactions = (await db.scalars(ordered(query, order).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        next_cursor = encode_cursor(transactions[-1])
+    return {"items": transactions, "next_cursor": next_cursor}
+
+@router.get("/summary", response_model=TransactionSummary)
+async def read_transaction_summary(month: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    """Dashboard totals served from the monthly/category rollups. `month` is YYYY-MM."""
+    return await db.run_sync(rollup_service.get_summary, month)
+
+@router.get("/search", response_model=TransactionSearchPage)
+async def search_transactions(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Ranked full-text search over descriptions and notes"""
+    results = await db.run_sync(search_service.search, q, limit + 1, offset)
+    next_offset = offset + limit if len(results) > limit else None
+    items = []
+    for tx, rank in results[:limit]:
+        tx.rank = rank  # transient, only read by the response model
+        items.append(tx)
+    return {"items": items, "next_offset": next_offset}
+
+@router.get("/export")
+def export_transactions(format: Literal["csv", "ndjson"] = "csv", filters: TransactionFilters = Depends()):
+    """Stream the (filtered) ledger oldest-first as CSV or NDJSON"""
+    if format == "ndjson":
+        return StreamingResponse(
+            export_service.stream_ndjson(filters),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": "attachment; filename=transactions.ndjson"},
+        )
+    return StreamingResponse(
+        export_service.stream_csv(filters),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=transactions.csv"},
+    )
+
 @router.get("/{transaction_id}", response_model=Transaction)
-def read_transaction(transaction_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_transaction = db.query(TransactionModel).filter(TransactionModel.id == transaction_id).first()
+async def read_transaction(transaction_id: uuid.UUID, db: AsyncSession = Depends(get_async_read_db)):
+    db_transaction = await db.get(TransactionModel, transaction_id)
     if db_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return db_transaction
 
 @router.patch("/{transaction_id}", response_model=Transaction)
-def update_transaction(transaction_id: uuid.UUID, transaction: TransactionUpdate, db: Session = Depends(get_db)):
-    db_transaction = db.query(TransactionModel).filter(TransactionModel.id == transaction_id).first()
+async def update_transaction(transaction_id: uuid.UUID, transaction: TransactionUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_transaction = await db.get(TransactionModel, transaction_id)
     if db_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
@@ -43,57 +106,83 @@ def update_transaction(transaction_id: uuid.UUID, transaction: TransactionUpdate
     # if 'amount' in update_data:
     #     update_data['amount'] = int(update_data['amount'] * 100)
 
+    before = ledger_events.capture(db_transaction)
     for key, value in update_data.items():
         setattr(db_transaction, key, value)
+    await db.run_sync(ledger_events.apply, added=[db_transaction], removed=[before])
         
-    db.commit()
-    db.refresh(db_transaction)
+    await db.commit()
+    await db.refresh(db_transaction)
+    ledger_events.committed(added=[db_transaction], removed=[before])
     return db_transaction
 
 @router.delete("/{transaction_id}", status_code=204)
-def delete_transaction(transaction_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_transaction = db.query(TransactionModel).filter(TransactionModel.id == transaction_id).first()
+async def delete_transaction(transaction_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
+    db_transaction = await db.get(TransactionModel, transaction_id)
     if db_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
-    db.delete(db_transaction)
-    db.commit()
+    await db.run_sync(ledger_events.apply, removed=[db_transaction])
+    await db.delete(db_transaction)
+    await db.commit()
+    ledger_events.committed(removed=[db_transaction])
     return
 
-@router.post("/bulk", status_code=201)
-async def create_bulk_transactions(file: UploadFile = File(...), db: Session = Depends(get_db)):
+@router.post("/batch", response_model=TransactionBatchResult)
+async def batch_transactions(request: TransactionBatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Apply mixed create/update/delete operations in one DB transaction.
+
+    Invalid items are reported per index as failed; with `atomic` any failure skips the whole batch
+    and the valid items are counted as skipped.
+    """
+    if len(request.operations) > transaction_batch_service.MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {transaction_batch_service.MAX_OPERATIONS} operations per batch",
+        )
+
+    results, added, removed = await db.run_sync(
+        transaction_batch_service.apply_batch, request.operations, request.atomic
+    )
+    await db.commit()
+    ledger_events.committed(added=added, removed=removed)
+
+    counts = {status: sum(1 for r in results if r["status"] == status) for status in ("ok", "error", "skipped")}
+    return {"applied": counts["ok"], "failed": counts["error"], "skipped": counts["skipped"], "results": results}
+
+# CSV parsing is CPU-bound, so the importer stays sync and runs in the threadpool
+@router.post("/bulk", status_code=201, response_model=BulkImportResult)
+def create_bulk_transactions(file: UploadFile = File(...), db: Session = Depends(get_db)):
     if file.content_type != 'text/csv':
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a CSV.")
 
-    content = await file.read()
-    stream = io.StringIO(content.decode("utf-8"))
-    reader = csv.DictReader(stream)
-    
-    transactions_to_create = []
-    for row in reader:
-        # Basic validation and data transformation
-        try:
-            transaction_data = {
-                "date": row["Date"],
-                "amount": float(row["Amount"]),
-                "description": row["Description"],
-                "category_id": row["CategoryID"], # Assuming Category ID is in the CSV
-            }
-            transactions_to_create.append(TransactionModel(**transaction_data))
-        except (KeyError, ValueError) as e:
-            raise HTTPException(status_code=400, detail=f"CSV processing error: {e}")
-
-    if not transactions_to_create:
+    # The upload is already spooled to a temp file; wrap it so rows are decoded lazily
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        result = csv_import_service.import_transactions(db, stream)
+    except (csv.Error, UnicodeDecodeError) as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"CSV processing error: {e}")
+    finally:
+        stream.detach()
+
+    if result["accepted"] == 0 and result["rejected"] == 0:
         raise HTTPException(status_code=400, detail="CSV file is empty or malformed.")
 
-    db.add_all(transactions_to_create)
-    db.commit()
-    
-    return {"message": f"Successfully uploaded and created {len(transactions_to_create)} transactions."}
+    # Reloading once is cheaper than patching in-memory state row by row for a large import
+    if result["accepted"]:
+        ledger_events.reload()
+    if not result["accepted"]:
+        result["message"] = f"No transactions were created; {result['rejected']} rows were rejected."
+    elif result["rejected"]:
+        result["message"] = f"Created {result['accepted']} transactions; {result['rejected']} rows were rejected."
+    else:
+        result["message"] = f"Successfully uploaded and created {result['accepted']} transactions."
+    return result
 
 @router.post("/{transaction_id}/attach-receipt", response_model=Transaction)
-async def attach_receipt(transaction_id: uuid.UUID, file: UploadFile = File(...), db: Session = Depends(get_db)):
-    db_transaction = db.query(TransactionModel).filter(TransactionModel.id == transaction_id).first()
+async def attach_receipt(transaction_id: uuid.UUID, file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db)):
+    db_transaction = await db.get(TransactionModel, transaction_id)
     if db_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
@@ -106,7 +195,7 @@ async def attach_receipt(transaction_id: uuid.UUID, file: UploadFile = File(...)
         file_object.write(await file.read())
 
     db_transaction.receipt_url = f"/static/{file_location}" # Example URL
-    db.commit()
-    db.refresh(db_transaction)
+    await db.commit()
+    await db.refresh(db_transaction)
     
     return db_transaction
\ No newline at end of file
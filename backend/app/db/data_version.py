@@ -0,0 +1,64 @@
+"""
+Process-wide data version for caches derived from the financial tables.
+
+Session events note which watched tables a unit of work touched, through ORM
+flushes or through insert/update/delete statements passed to Session.execute,
+and bump the counter once the transaction commits. A rollback discards the
+marks. Caches key on current() and never need explicit invalidation.
+
+The counter is per process, like the ledger snapshot. With several workers,
+each process only sees its own writes.
+"""
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+WATCHED_TABLES = frozenset({
+    "transactions", "categories", "goals", "goal_links", "goal_contributions", "recurring_expenses",
+})
+
+_version = 0
+_lock = threading.Lock()
+_PENDING = "data_version_pending"
+
+
+def current() -> int:
+    return _version
+
+
+def bump():
+    global _version
+    with _lock:
+        _version += 1
+
+
+def _mark(session: Session, table_name: str):
+    if table_name in WATCHED_TABLES:
+        session.info[_PENDING] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table_name = getattr(obj, "__tablename__", None)
+        if table_name:
+            _mark(session, table_name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _mark(orm_execute_state.session, table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop(_PENDING, False):
+        bump()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_PENDING, None)
@@ -1,23 +1,149 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+from app.db.instrumentation import instrument_engine
+from app.db import data_version  # noqa: F401  (registers session commit hooks)
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional Postgres replica that read-only sessions are routed to
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+# "production" turns on WAL + tuned pragmas and a separate read pool for SQLite
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default").lower()
+SQLITE_PRODUCTION = (
+    IS_SQLITE
+    and SQLITE_PROFILE == "production"
+    and make_url(DATABASE_URL).database not in (None, "", ":memory:")
+)
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+SQLITE_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # negative = KiB, so 64 MiB
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+}
+
+def _apply_sqlite_pragmas(engine, read_only: bool = False):
+    """Tune every new SQLite connection of `engine` (sync or the sync side of an async engine)"""
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not read_only:
+            # WAL lets readers run alongside the single writer; it is persisted in the file
+            cursor.execute("PRAGMA journal_mode=WAL")
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
 
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def _make_engine(url: str, read_only: bool = False):
+    if url.startswith("sqlite"):
+        kwargs = {"connect_args": {"check_same_thread": False}}
+        if SQLITE_PRODUCTION and read_only:
+            kwargs.update(pool_size=SQLITE_READ_POOL_SIZE, max_overflow=SQLITE_READ_POOL_SIZE)
+        new_engine = create_engine(url, **kwargs)
+        if SQLITE_PRODUCTION:
+            _apply_sqlite_pragmas(new_engine, read_only)
+        return new_engine
+    return create_engine(url)
+
+engine = _make_engine(DATABASE_URL)
+if SQLITE_PRODUCTION:
+    read_engine = _make_engine(DATABASE_URL, read_only=True)
+elif DATABASE_READ_URL and not IS_SQLITE:
+    read_engine = create_engine(DATABASE_READ_URL)
 else:
-    engine = create_engine(DATABASE_URL)
+    read_engine = engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (aiosqlite / asyncpg)"""
+    scheme, _, rest = url.partition("://")
+    driver = scheme.split("+")[0]
+    if driver == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if driver in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+def _make_async_engine(url: str, read_only: bool = False):
+    async_engine = create_async_engine(url)
+    if SQLITE_PRODUCTION:
+        _apply_sqlite_pragmas(async_engine.sync_engine, read_only)
+    return async_engine
+
+# Async engine for routes that should not hold a threadpool worker while waiting on the DB.
+# ASYNC_DATABASE_URL overrides the URL derived from DATABASE_URL.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+async_engine = _make_async_engine(ASYNC_DATABASE_URL)
+if SQLITE_PRODUCTION:
+    async_read_engine = _make_async_engine(ASYNC_DATABASE_URL, read_only=True)
+elif DATABASE_READ_URL and not IS_SQLITE:
+    async_read_engine = create_async_engine(to_async_url(DATABASE_READ_URL))
+else:
+    async_read_engine = async_engine
+# expire_on_commit=False so committed objects can be serialized without an implicit (sync) reload
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+for _engine in (engine, read_engine, async_engine.sync_engine, async_read_engine.sync_engine):
+    instrument_engine(_engine)
+
+def create_missing_columns():
+    """create_all() doesn't alter existing tables; add nullable columns added to a model since"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable and column.server_default is None:
+                    conn.execute(text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                    ))
+
+def create_missing_indexes():
+    """create_all() skips indexes on tables that already exist; add any that are missing
+    and drop the ones a table lists in info["superseded_indexes"]"""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for name in table.info.get("superseded_indexes", ()):
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Session for read-only routes; never waits on the writer (WAL) or hits the replica"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,179 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor execute events on every engine feed a request-scoped collector (held in
+a ContextVar, so it follows the request into the threadpool). The HTTP
+middleware reports query count and DB time as a Server-Timing header, keeps a
+ring buffer of recent requests for /_debug/queries, and logs a warning when
+one statement shape repeats often enough to look like an N+1 pattern.
+Requests are grouped by route template ("/transactions/{transaction_id}"), not
+by concrete URL. /_debug/queries shows SQL, so it is only mounted when
+SQL_DEBUG_ENDPOINT=1.
+"""
+import logging
+import os
+import re
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+RECENT_REQUESTS = int(os.getenv("SQL_DEBUG_HISTORY", "200"))
+DEBUG_ENDPOINT = os.getenv("SQL_DEBUG_ENDPOINT", "0") == "1"
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_PARAM_LIST_RE = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*\)")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+
+_current = ContextVar("sql_request_stats", default=None)
+_recent = deque(maxlen=RECENT_REQUESTS)
+_instrumented = set()
+
+
+def fingerprint(statement: str) -> str:
+    """Reduce a statement to its shape: collapse whitespace, IN-lists and numeric literals"""
+    shape = _WHITESPACE_RE.sub(" ", statement).strip()
+    shape = _PARAM_LIST_RE.sub("(?...)", shape)
+    return _NUMBER_RE.sub("N", shape)
+
+
+class RequestQueryStats:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.route = path
+        self.count = 0
+        self.db_ms = 0.0
+        self.shapes = Counter()
+        self.shape_ms = defaultdict(float)
+
+    def record(self, statement: str, elapsed_ms: float):
+        shape = fingerprint(statement)
+        self.count += 1
+        self.db_ms += elapsed_ms
+        self.shapes[shape] += 1
+        self.shape_ms[shape] += elapsed_ms
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list:
+        return [
+            {"statement": shape, "count": count, "total_ms": round(self.shape_ms[shape], 3)}
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+    def as_dict(self, total_ms: Optional[float] = None) -> dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "queries": self.count,
+            "db_ms": round(self.db_ms, 3),
+            "total_ms": round(total_ms, 3) if total_ms is not None else None,
+            "suspected_n_plus_one": self.repeated(),
+            "top_statements": [
+                {"statement": shape, "count": count, "total_ms": round(self.shape_ms[shape], 3)}
+                for shape, count in self.shapes.most_common(5)
+            ],
+        }
+
+
+def instrument_engine(engine):
+    """Attach timing listeners to a sync engine (use `.sync_engine` for async engines)"""
+    if id(engine) in _instrumented:
+        return
+    _instrumented.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["sql_started"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, (time.perf_counter() - started) * 1000)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("sql_started"):
+            conn.info["sql_started"].pop()
+
+
+def route_template(request) -> str:
+    """The matched route's path template, e.g. /api/v1/transactions/{transaction_id}.
+
+    Routers that keep included routers nested only record the innermost route's path, so the
+    prefix is taken from the concrete URL. Unmatched requests keep the raw path.
+    """
+    path = request.url.path
+    route = request.scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if not path_format:
+        return path
+    try:
+        tail = path_format.format(**request.path_params)
+    except (KeyError, IndexError, ValueError):
+        return path_format
+    return path[: len(path) - len(tail)] + path_format if path.endswith(tail) else path_format
+
+
+async def query_stats_middleware(request, call_next):
+    stats = RequestQueryStats(request.method, request.url.path)
+    token = _current.set(stats)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _current.reset(token)
+    total_ms = (time.perf_counter() - started) * 1000
+    stats.route = route_template(request)
+
+    # Streaming bodies may still query after this point; the header covers the handler only
+    response.headers["Server-Timing"] = (
+        f'db;dur={stats.db_ms:.2f};desc="{stats.count} queries", app;dur={total_ms:.2f}'
+    )
+    record = stats.as_dict(total_ms)
+    if record["suspected_n_plus_one"]:
+        worst = record["suspected_n_plus_one"][0]
+        logger.warning(
+            "Possible N+1 in %s %s: %d queries, statement ran %d times: %s",
+            stats.method, stats.route, stats.count, worst["count"], worst["statement"][:200],
+        )
+    if stats.count:
+        _recent.append(record)
+    return response
+
+
+def recent_requests(limit: int = 50) -> list:
+    return list(_recent)[-limit:][::-1]
+
+
+def endpoint_summary() -> list:
+    """Aggregate the ring buffer per endpoint, heaviest first"""
+    totals = defaultdict(lambda: {"requests": 0, "queries": 0, "db_ms": 0.0, "n_plus_one_hits": 0})
+    for record in _recent:
+        row = totals[f"{record['method']} {record['route']}"]
+        row["requests"] += 1
+        row["queries"] += record["queries"]
+        row["db_ms"] += record["db_ms"]
+        row["n_plus_one_hits"] += bool(record["suspected_n_plus_one"])
+    return sorted(
+        (
+            {
+                "endpoint": endpoint,
+                "requests": row["requests"],
+                "avg_queries": round(row["queries"] / row["requests"], 2),
+                "avg_db_ms": round(row["db_ms"] / row["requests"], 3),
+                "n_plus_one_hits": row["n_plus_one_hits"],
+            }
+            for endpoint, row in totals.items()
+        ),
+        key=lambda r: r["avg_db_ms"],
+        reverse=True,
+    )
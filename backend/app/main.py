@@ -1,16 +1,26 @@
 from fastapi import FastAPI, Depends, HTTPException, Request, APIRouter, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
 import yfinance as yf
 
-from app.api.v1.routes import categories, transactions, goals, recurring, ai, train, phoneme
-from app.db.database import engine, Base
+from app.api.v1.routes import categories, transactions, goals, recurring, ai, train, phoneme, analytics
+from app.db.database import engine, Base, ReadSessionLocal, create_missing_columns, create_missing_indexes
+from app.db import instrumentation
+from app.services.search_service import ensure_search_index
+from app.services import model_warmup
+from app.services.ledger_snapshot import ledger_snapshot
+from app.services import categorizer
 
 load_dotenv()
 
 # This will create the tables in the database
 Base.metadata.create_all(bind=engine)
+create_missing_columns()
+create_missing_indexes()
+ensure_search_index(engine)
 
 app = FastAPI(title="Finance AI API", version="1.0")
 
@@ -25,6 +35,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request query count / DB time (Server-Timing header, /_debug/queries)
+app.middleware("http")(instrumentation.query_stats_middleware)
+
 # Ensure generated audio directory exists
 os.makedirs("generated_audio", exist_ok=True)
 # Mount static directory for serving audio files
@@ -36,12 +49,34 @@ api_v1_router.include_router(categories.router, prefix="/categories", tags=["Cat
 api_v1_router.include_router(transactions.router, prefix="/transactions", tags=["Transactions"])
 api_v1_router.include_router(goals.router, prefix="/goals", tags=["Goals"])
 api_v1_router.include_router(recurring.router, prefix="/recurring", tags=["Recurring Expenses"])
+api_v1_router.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
 api_v1_router.include_router(ai.router, prefix="/ai", tags=["AI"])
 api_v1_router.include_router(train.router, prefix="/train", tags=["Training"])
 api_v1_router.include_router(phoneme.router, prefix="/phoneme", tags=["Phoneme"])
 
 app.include_router(api_v1_router, prefix="/api/v1")
 
+def load_projections():
+    try:
+        with ReadSessionLocal() as db:
+            ledger_snapshot.ensure_loaded(db)
+        categorizer.preload()
+    except Exception as e:
+        # Not fatal: the first query that needs them loads them instead
+        logging.getLogger(__name__).warning("Loading in-memory projections at startup failed: %s", e)
+
+# Build the analytics snapshot and the categorizer index in a worker thread, so neither
+# startup, the first query nor the event loop waits on them
+@app.on_event("startup")
+async def start_projection_load():
+    app.state.projection_task = asyncio.create_task(asyncio.to_thread(load_projections))
+
+# Load the chat model(s) in the background so the first chat skips the cold start
+@app.on_event("startup")
+async def start_model_warmup():
+    if model_warmup.ENABLED:
+        app.state.warmup_task = asyncio.create_task(model_warmup.run_forever(ai.ai_service))
+
 
 # --- Health Checks ---
 @app.get("/_health/live", tags=["Health"])
@@ -53,6 +88,16 @@ def health_ready():
     # In a real app, you might check db connection here
     return {"status": "ready"}
 
+def debug_queries(limit: int = 50):
+    return {
+        "endpoints": instrumentation.endpoint_summary(),
+        "recent": instrumentation.recent_requests(limit),
+    }
+
+# Exposes SQL statements, so only mounted when asked for
+if instrumentation.DEBUG_ENDPOINT:
+    app.get("/_debug/queries", tags=["Health"])(debug_queries)
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Finance AI API"}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship, declared_attr
 from datetime import datetime
 import uuid
@@ -10,12 +10,26 @@ class ChatSessionMixin(object):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # The sidebar lists sessions newest-updated first, paged by an (updated_at, id) cursor
+    @declared_attr
+    def __table_args__(cls):
+        return (Index(f"ix_{cls.__tablename__}_updated_id", "updated_at", "id"),)
+
 class ChatMessageMixin(object):
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     role = Column(String, nullable=False) # user, assistant
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # History is always read per session, newest first; id breaks created_at ties in the keyset cursor.
+    # The (session_id, created_at) index it replaces is a prefix of it and gets dropped at startup.
+    @declared_attr
+    def __table_args__(cls):
+        return (
+            Index(f"ix_{cls.__tablename__}_session_created_id", "session_id", "created_at", "id"),
+            {"info": {"superseded_indexes": [f"ix_{cls.__tablename__}_session_created"]}},
+        )
+
 # RAG
 class RAGChatSession(Base, ChatSessionMixin):
     __tablename__ = "rag_chat_sessions"
@@ -45,3 +59,19 @@ class DashboardChatMessage(Base, ChatMessageMixin):
     __tablename__ = "dashboard_chat_messages"
     session_id = Column(String, ForeignKey("dashboard_chat_sessions.id"), nullable=False)
     session = relationship("DashboardChatSession", back_populates="messages")
+
+# Rolling summary of the turns that no longer fit in the prompt, one per session.
+# Sessions live in three tables, so the row is keyed by section + session id.
+class ChatSummary(Base):
+    __tablename__ = "chat_summaries"
+    __table_args__ = (UniqueConstraint("section", "session_id", name="uq_chat_summaries_session"),)
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    section = Column(String, nullable=False)
+    session_id = Column(String, nullable=False)
+    content = Column(Text, nullable=False, default="")
+    # (created_at, id) of the newest message folded into the summary
+    covered_until = Column(DateTime)
+    covered_message_id = Column(String)
+    message_count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
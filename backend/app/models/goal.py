@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.sql import func
 from app.db.database import Base
 import uuid
@@ -12,4 +12,30 @@ class Goal(Base):
     target_amount = Column(Float)
     current_amount = Column(Float, default=0.0)
     deadline = Column(DateTime, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class GoalLink(Base):
+    """Routes a single transaction, or every transaction in a category, to a goal.
+    A direct transaction link wins over a category link."""
+    __tablename__ = "goal_links"
+
+    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    goal_id = Column(String, ForeignKey("goals.id"), nullable=False, index=True)
+    transaction_id = Column(UUID(as_uuid=True), ForeignKey("transactions.id"), nullable=True, unique=True)
+    category_id = Column(UUID(as_uuid=True), ForeignKey("categories.id"), nullable=True, unique=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class GoalContribution(Base):
+    """One row per linked transaction, plus manual adjustments (transaction_id NULL).
+    A goal's current_amount is always the sum of its contributions."""
+    __tablename__ = "goal_contributions"
+    __table_args__ = (
+        Index("ix_goal_contributions_goal_date", "goal_id", "date"),
+    )
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    goal_id = Column(String, ForeignKey("goals.id"), nullable=False)
+    transaction_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    amount = Column(Float, nullable=False)
+    date = Column(DateTime, nullable=False)
+    note = Column(String, nullable=True)
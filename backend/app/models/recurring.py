@@ -10,6 +10,8 @@ class RecurringExpense(Base):
     name = Column(String, index=True)
     amount = Column(Float)
     frequency = Column(String) # e.g., "Monthly", "Weekly"
-    next_due_date = Column(DateTime)
+    next_due_date = Column(DateTime, index=True)
+    # Day of month that month-based rules fall on; next_due_date is clamped in short months
+    anchor_day = Column(Integer, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
@@ -0,0 +1,16 @@
+import uuid
+from sqlalchemy import Column, String, Float, Integer, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from app.db.database import Base
+
+class TransactionRollup(Base):
+    __tablename__ = "transaction_rollups"
+    __table_args__ = (UniqueConstraint("month", "category_id", name="uq_rollup_month_category"),)
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    month = Column(String(7), nullable=False, index=True) # YYYY-MM
+    category_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    total = Column(Float, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
+    income = Column(Float, nullable=False, default=0.0)
+    expense = Column(Float, nullable=False, default=0.0) # Stored as a positive number
@@ -0,0 +1,47 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+import uuid
+import datetime
+
+class RangeSum(BaseModel):
+    total: float
+    income: float
+    expense: float
+    count: int
+
+class CategoryBreakdown(RangeSum):
+    category_id: Optional[uuid.UUID] = None
+
+class MonthBreakdown(RangeSum):
+    month: str
+
+class TopTransaction(BaseModel):
+    id: uuid.UUID
+    date: datetime.datetime
+    amount: float
+    category_id: Optional[uuid.UUID] = None
+
+class SnapshotStats(BaseModel):
+    loaded: bool
+    rows: int
+    categories: int
+    array_bytes: Dict[str, int]
+    total_bytes: int
+    last_rebuild_at: Optional[datetime.datetime] = None
+    last_rebuild_seconds: Optional[float] = None
+
+
+class ForecastPoint(BaseModel):
+    period: str
+    recurring: float
+    scheduled: float
+    discretionary: float
+    balance: float
+
+class CashFlowForecast(BaseModel):
+    as_of: datetime.date
+    granularity: str
+    starting_balance: float
+    daily_discretionary: float
+    points: List[ForecastPoint]
+    generated_at: datetime.datetime
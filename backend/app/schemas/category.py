@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 import uuid
-from typing import Optional
+import datetime
+from typing import List, Optional
 
 class CategoryBase(BaseModel):
     name: str
@@ -17,4 +18,25 @@ class Category(CategoryBase):
     id: uuid.UUID
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class CategorySuggestion(BaseModel):
+    category_id: uuid.UUID
+    name: str
+    is_income: bool
+    confidence: float
+    support: int
+
+class CategorySuggestions(BaseModel):
+    description: str
+    suggestions: List[CategorySuggestion]
+    lookup_microseconds: float
+
+class CategorizerStats(BaseModel):
+    loaded: bool
+    features: int
+    transactions_learned: int
+    last_rebuild_at: Optional[datetime.datetime] = None
+    last_rebuild_seconds: Optional[float] = None
+    lookups: int
+    suggested: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class ChatMessageBase(BaseModel):
@@ -17,6 +17,29 @@ class ChatMessage(ChatMessageBase):
     class Config:
         orm_mode = True
 
+class ChatMessagePage(BaseModel):
+    items: List[ChatMessage]
+    next_before: Optional[str] = None
+
+class ChatSummary(BaseModel):
+    session_id: str
+    content: str
+    message_count: int
+    covered_until: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class ConversationMemoryStats(BaseModel):
+    history_tokens: int
+    summary_tokens: int
+    running: int
+    compactions: int
+    summarized_messages: int
+    skipped: int
+    failures: int
+
 class ChatSessionBase(BaseModel):
     title: str
 
@@ -34,3 +57,86 @@ class ChatSession(ChatSessionBase):
 
     class Config:
         orm_mode = True
+
+class ChatSessionSummary(ChatSessionBase):
+    id: str
+    created_at: datetime
+    updated_at: datetime
+    message_count: int = 0
+    last_message_role: Optional[str] = None
+    last_message_preview: Optional[str] = None
+
+class ChatSessionSummaryPage(BaseModel):
+    items: List[ChatSessionSummary]
+    next_cursor: Optional[str] = None
+
+class ContextCacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float
+    avg_build_ms: float
+    estimated_saved_ms: float
+    data_version: int
+    cached_version: Optional[int] = None
+
+class ContextSectionTokens(BaseModel):
+    section: str
+    tokens: int
+    budget: Optional[int] = None
+    items: Optional[int] = None
+    included: Optional[int] = None
+
+class ContextReport(BaseModel):
+    total_tokens: int
+    sections: List[ContextSectionTokens]
+
+class GenerationQueueStats(BaseModel):
+    running: int
+    waiting: int
+    max_concurrent: int
+    max_queued: int
+    avg_generation_seconds: float
+    admitted: int
+    queued: int
+    rejected: int
+    cancelled: int
+
+class ResponseCacheStats(BaseModel):
+    entries: int
+    max_entries: int
+    ttl_seconds: float
+    hit_rate: float
+    hits: int
+    misses: int
+    stores: int
+    evictions: int
+    expired: int
+
+class FastPathStats(BaseModel):
+    messages: int
+    served: int
+    unmatched: int
+    ambiguous: int
+    served_fraction: float
+
+class TTFTSummary(BaseModel):
+    count: int
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    max_ms: Optional[float] = None
+
+class ModelWarmupStatus(BaseModel):
+    warmed_at: Optional[datetime] = None
+    load_seconds: Optional[float] = None
+    prefix_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+class ModelLatencyReport(BaseModel):
+    model: str
+    keep_alive: Optional[str] = None
+    warmed_up: bool
+    ttft_before_warmup: TTFTSummary
+    ttft_after_warmup: TTFTSummary
+    avg_prompt_tokens_evaluated: Optional[float] = None
+    last_warmup_at: Optional[datetime] = None
+    warmup: Dict[str, ModelWarmupStatus] = {}
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+import uuid
 import datetime
 
 class GoalBase(BaseModel):
@@ -22,4 +23,31 @@ class Goal(GoalBase):
     created_at: datetime.datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class GoalLinkCreate(BaseModel):
+    transaction_id: Optional[uuid.UUID] = None
+    category_id: Optional[uuid.UUID] = None
+
+class GoalLink(GoalLinkCreate):
+    id: str
+    goal_id: str
+    created_at: Optional[datetime.datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class GoalContribution(BaseModel):
+    id: str
+    goal_id: str
+    transaction_id: Optional[uuid.UUID] = None
+    amount: float
+    date: datetime.datetime
+    note: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class GoalReconcileResult(BaseModel):
+    goals: int
+    contributions: int
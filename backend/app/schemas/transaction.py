@@ -1,7 +1,7 @@
 from pydantic import BaseModel
 import uuid
 import datetime
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 
 class TransactionBase(BaseModel):
     amount: float
@@ -26,4 +26,70 @@ class Transaction(TransactionBase):
     id: uuid.UUID
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class TransactionPage(BaseModel):
+    items: List[Transaction]
+    next_cursor: Optional[str] = None
+
+class TransactionSearchResult(Transaction):
+    rank: float
+
+class TransactionSearchPage(BaseModel):
+    items: List[TransactionSearchResult]
+    next_offset: Optional[int] = None
+
+class TransactionBatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[uuid.UUID] = None
+    data: Optional[Dict[str, Any]] = None
+
+class TransactionBatchRequest(BaseModel):
+    operations: List[TransactionBatchOperation]
+    atomic: bool = False
+
+class TransactionBatchItemResult(BaseModel):
+    index: int
+    op: str
+    status: Literal["ok", "error", "skipped"]
+    id: Optional[uuid.UUID] = None
+    error: Optional[str] = None
+
+class TransactionBatchResult(BaseModel):
+    applied: int
+    failed: int
+    skipped: int = 0
+    results: List[TransactionBatchItemResult]
+
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    message: str
+    accepted: int
+    rejected: int
+    auto_categorized: int = 0
+    errors: List[BulkImportError] = []
+    errors_truncated: bool = False
+
+class RollupTotals(BaseModel):
+    total: float
+    count: int
+    income: float
+    expense: float
+
+class CategorySummary(RollupTotals):
+    category_id: Optional[uuid.UUID] = None
+
+class MonthSummary(RollupTotals):
+    month: str
+
+class TransactionSummary(BaseModel):
+    month: Optional[str] = None
+    total_balance: float
+    income: float
+    expenses: float
+    transaction_count: int
+    by_category: List[CategorySummary] = []
+    by_month: List[MonthSummary] = []
@@ -0,0 +1,166 @@
+"""
+Action Executor - Runs the JSON actions the chat model emits, while it streams.
+
+The system prompt asks the model to wrap actions in fenced ```json blocks.
+`ActionBlockParser` is fed the reply chunk by chunk and hands back each block
+as soon as its closing fence arrives, so the chat route can execute it
+before the rest of the answer has been generated. `execute()` validates the
+action against the same schemas as the REST endpoints and writes it the same
+way (transactions go through ledger_events), returning a result the route
+sends to the client as an `action_result` event.
+
+Blocks that are not JSON objects with an "action" key are ignored, since the
+model may also show code or examples in fences.
+"""
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.models.category import Category
+from app.models.goal import Goal
+from app.models.transaction import Transaction
+from app.schemas.goal import GoalCreate
+from app.schemas.transaction import TransactionCreate
+from app.services import context_builder, goal_service, ledger_events
+from app.services.categorizer import categorizer
+
+logger = logging.getLogger(__name__)
+
+FENCE = "```"
+ACTIONS = ("add_transaction", "create_goal")
+
+
+class ActionBlockParser:
+    """Finds complete fenced blocks in a stream of text chunks"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_block = False
+
+    def feed(self, chunk: str) -> List[dict]:
+        """Add a chunk; return the actions whose closing fence has now arrived"""
+        self._buffer += chunk
+        actions = []
+        while True:
+            start = self._buffer.find(FENCE)
+            if start < 0:
+                # Keep a possible partial fence at the end, drop the rest
+                if not self._in_block:
+                    self._buffer = self._buffer[-(len(FENCE) - 1):]
+                return actions
+            if not self._in_block:
+                self._buffer = self._buffer[start + len(FENCE):]
+                self._in_block = True
+                continue
+            body, self._buffer = self._buffer[:start], self._buffer[start + len(FENCE):]
+            self._in_block = False
+            action = parse_block(body)
+            if action is not None:
+                actions.append(action)
+
+
+def parse_block(body: str) -> Optional[dict]:
+    """The action in a fenced block's body (language tag optional), or None"""
+    body = body.strip()
+    if body[:4].lower() == "json":
+        body = body[4:]
+    try:
+        action = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(action, dict) or "action" not in action:
+        return None
+    return action
+
+
+def _resolve_category(db: Session, data: dict):
+    """The given ID if it exists, else match by name or description, then by the learned categorizer.
+
+    None when nothing fits; the action then fails rather than guessing a category.
+    """
+    try:
+        category_id = uuid.UUID(str(data.get("category_id")))
+    except ValueError:
+        category_id = None  # missing, the prompt's placeholder, or not an ID at all
+    if category_id is not None and db.query(Category.id).filter(Category.id == category_id).first() is not None:
+        return category_id
+    categories = [{"id": str(c.id), "name": c.name} for c in db.query(Category.id, Category.name).order_by(Category.name)]
+    if not categories:
+        return None
+    wanted = (data.get("category") or data.get("category_name") or "").lower()
+    for category in categories:
+        if wanted and category["name"].lower() == wanted:
+            return category["id"]
+    matches = context_builder.relevant_categories(categories, " ".join(filter(None, [wanted, data.get("description")])))
+    if matches:
+        return matches[0]["id"]
+    # What the user's own history says this description usually is (the chat route loads the index)
+    learned = categorizer.best(data.get("description") or "")
+    if learned is not None and any(c["id"] == learned for c in categories):
+        return learned
+    return None
+
+
+def _add_transaction(db: Session, data: dict) -> dict:
+    category_id = _resolve_category(db, data)
+    if category_id is None:
+        raise ValueError("Could not determine a category; use a category_id or name from the list")
+    data = {**data, "category_id": category_id, "date": data.get("date") or datetime.now()}
+    transaction = TransactionCreate(**{k: v for k, v in data.items() if k in TransactionCreate.__fields__})
+    db_transaction = Transaction(**transaction.dict())
+    db.add(db_transaction)
+    ledger_events.apply(db, added=[db_transaction])
+    db.commit()
+    db.refresh(db_transaction)
+    ledger_events.committed(added=[db_transaction])
+    return {
+        "id": str(db_transaction.id),
+        "amount": db_transaction.amount,
+        "description": db_transaction.description,
+        "category_id": str(db_transaction.category_id),
+        "date": db_transaction.date.isoformat(),
+    }
+
+
+def _create_goal(db: Session, data: dict) -> dict:
+    goal = GoalCreate(**{k: v for k, v in data.items() if k in GoalCreate.__fields__})
+    db_goal = Goal(**goal.dict())
+    db.add(db_goal)
+    db.flush()
+    goal_service.record_manual(db, db_goal, db_goal.current_amount, "Opening balance")
+    db.commit()
+    db.refresh(db_goal)
+    return {"id": str(db_goal.id), "name": db_goal.name, "target_amount": db_goal.target_amount}
+
+
+def execute(db: Session, action: dict) -> dict:
+    """Validate and run one action. Never raises; failures come back with status "error"."""
+    name = action.get("action")
+    result = {"action": name, "status": "ok", "data": None, "error": None}
+    data = action.get("data")
+    if name not in ACTIONS:
+        result.update(status="error", error=f"Unknown action: {name}")
+        return result
+    if not isinstance(data, dict):
+        result.update(status="error", error="Action data must be an object")
+        return result
+    try:
+        if name == "add_transaction":
+            result["data"] = _add_transaction(db, data)
+        else:
+            result["data"] = _create_goal(db, data)
+    except ValidationError as e:
+        db.rollback()
+        result.update(status="error", error="; ".join(
+            f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+        ))
+    except Exception as e:
+        db.rollback()
+        logger.warning("Chat action %s failed: %s", name, e)
+        result.update(status="error", error=str(e))
+    return result
@@ -1,127 +1,158 @@
 import ollama
 import os
 import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
 from sqlalchemy.orm import Session
-from app.models.transaction import Transaction
-from app.models.goal import Goal
-from app.models.recurring import RecurringExpense
-from app.models.category import Category
+from app.db import data_version
+from app.services import context_builder
+
+# Sections whose prompt carries the financial context and the action instructions
+FINANCIAL_SECTIONS = ("dashboard", "avatar")
+
+def _chunk_field(chunk, name):
+    # Chunks are pydantic models in recent ollama releases and dicts in older ones
+    value = getattr(chunk, name, None)
+    if value is None and isinstance(chunk, dict):
+        value = chunk.get(name)
+    return value
 
 class AIService:
     def __init__(self):
         self.model = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
-
-    def build_context(self, db: Session, section: str = "dashboard") -> str:
-        # Only build financial context for Dashboard and Avatar sections
-        if section.lower() not in ["dashboard", "avatar"]:
-            return "You are a helpful AI assistant."
-
-        # Fetch recent transactions (last 10)
-        transactions = db.query(Transaction).order_by(Transaction.date.desc()).limit(10).all()
-        tx_str = "\n".join([f"- {t.date.date()}: {t.description} ({t.amount})" for t in transactions])
-
-        # Fetch goals
-        goals = db.query(Goal).all()
-        goals_str = "\n".join([f"- {g.name}: {g.current_amount}/{g.target_amount} (Due: {g.deadline})" for g in goals])
-
-        # Fetch recurring
-        recurring = db.query(RecurringExpense).all()
-        rec_str = "\n".join([f"- {r.name}: {r.amount} ({r.frequency})" for r in recurring])
-
-        # Fetch categories
-        categories = db.query(Category).all()
-        cat_str = "\n".join([f"- '{c.name}' (ID: {c.id})" for c in categories])
-
-        context = f"""
-You are a fast and helpful financial assistant for an INDIAN user. Currency is always INR (₹).
-
-Recent Transactions:
-{tx_str}
-
-Financial Goals:
-{goals_str}
-
-Recurring Expenses:
-{rec_str}
-
-Available Categories:
-{cat_str}
-
-INSTRUCTIONS:
-1. BE PROACTIVE: When user says something like "add expense food 100" or "spent 100 on food", just DO IT immediately.
-2. DO NOT ask unnecessary questions. If user gives amount and category, act immediately.
-3. For simple commands, infer missing details intelligently:
-   - "add food 100" -> amount=100, description="food", find category with name containing "food"
-   - "spent 500 on groceries" -> amount=-500, description="groceries", find matching category
-   - "add expense chai 50" -> amount=-50, description="chai", use food category
-
-4. ONLY ask questions if critical info is truly missing (like amount or description).
-
-5. When executing an action, output JSON wrapped in markdown code blocks:
-
-For adding expense/transaction:
-```json
-{{
-  "action": "add_transaction",
-  "data": {{
-    "amount": -100,
-    "description": "food",
-    "category_id": "USE_ACTUAL_UUID_FROM_CATEGORIES"
-  }}
-}}
-```
-
-For adding income:
-```json
-{{
-  "action": "add_transaction", 
-  "data": {{
-    "amount": 5000,
-    "description": "salary",
-    "category_id": "USE_ACTUAL_UUID_FROM_CATEGORIES"
-  }}
-}}
-```
-
-For creating goals:
-```json
-{{
-  "action": "create_goal",
-  "data": {{
-    "name": "Vacation",
-    "target_amount": 50000
-  }}
-}}
-```
-
-IMPORTANT RULES:
-- Expenses are NEGATIVE amounts, Income is POSITIVE
-- ALWAYS use actual UUID from Available Categories list
-- If category name contains what user said (food, transport, etc), use that ID
-- Respond naturally but take action immediately when possible
-- DO NOT output JSON for read-only queries (like "how much did I spend")
-"""
+        # How long Ollama keeps the model loaded after each request
+        self.keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        self._async_client = None  # created on first use, inside the running event loop
+        self._ttft = deque(maxlen=200)  # (seconds, model was warmed up at the time)
+        self._prompt_eval = deque(maxlen=200)  # prompt tokens Ollama evaluated per reply
+        self.warmed_up = False
+        # Financial context is rebuilt only when data_version moves
+        self._context_lock = threading.Lock()
+        self._context_data = None
+        self._context_key = None
+        self.last_context_report = []
+        self.context_stats = {"hits": 0, "misses": 0, "build_seconds": 0.0}
+
+    def build_context(self, db: Session, section: str = "dashboard", message: str = "") -> str:
+        context, _ = self.build_context_with_report(db, section, message)
         return context
 
-    def generate_stream(self, prompt: str, db: Session, section: str = "dashboard", history: list = []):
-        system_context = self.build_context(db, section)
-        
-        # Build messages list
+    def build_context_with_report(self, db: Session, section: str = "dashboard", message: str = ""):
+        """System prompt for `message` plus the estimated tokens spent per section"""
+        # Only build financial context for Dashboard and Avatar sections
+        if section.lower() not in FINANCIAL_SECTIONS:
+            context = "You are a helpful AI assistant."
+            return context, [{"section": "header", "tokens": context_builder.estimate_tokens(context),
+                              "budget": None, "items": None, "included": None}]
+
+        context, report = context_builder.assemble(self.get_context_data(db), message)
+        self.last_context_report = report
+        return context, report
+
+    def get_context_data(self, db: Session) -> dict:
+        # Month-to-date figures also roll over with the calendar month
+        key = (data_version.current(), datetime.now().strftime("%Y-%m"))
+        with self._context_lock:
+            if self._context_data is not None and self._context_key == key:
+                self.context_stats["hits"] += 1
+                return self._context_data
+
+        started = time.perf_counter()
+        data = context_builder.collect(db)
+        elapsed = time.perf_counter() - started
+        with self._context_lock:
+            self.context_stats["misses"] += 1
+            self.context_stats["build_seconds"] += elapsed
+            # Tagged with the version read before the queries, so a write that
+            # lands mid-build forces the next caller to rebuild
+            self._context_data = data
+            self._context_key = key
+        return data
+
+    def get_context_stats(self) -> dict:
+        with self._context_lock:
+            stats = dict(self.context_stats)
+            cached_version = self._context_key[0] if self._context_key else None
+        misses = stats["misses"]
+        avg_build_ms = stats["build_seconds"] / misses * 1000 if misses else 0.0
+        lookups = stats["hits"] + misses
+        return {
+            "hits": stats["hits"],
+            "misses": misses,
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            "avg_build_ms": avg_build_ms,
+            "estimated_saved_ms": stats["hits"] * avg_build_ms,
+            "data_version": data_version.current(),
+            "cached_version": cached_version,
+        }
+
+    def _build_messages(self, system_context: str, prompt: str, history: list, summary: str = None) -> list:
         messages = [{'role': 'system', 'content': system_context}]
+        if summary:
+            messages.append({'role': 'system', 'content': f"Summary of the earlier conversation:\n{summary}"})
         
-        # Add history
+        # Add history (message rows, or dicts from conversation_memory)
         for msg in history:
-            role = 'user' if msg.role == 'user' else 'assistant'
-            messages.append({'role': role, 'content': msg.content})
+            role, content = (msg['role'], msg['content']) if isinstance(msg, dict) else (msg.role, msg.content)
+            role = 'user' if role == 'user' else 'assistant'
+            messages.append({'role': role, 'content': content})
             
         # Add current user prompt
         messages.append({'role': 'user', 'content': prompt})
-        
-        stream = ollama.chat(
+        return messages
+
+    async def astream_chat(self, system_context: str, prompt: str, history: list = [], summary: str = None):
+        """Stream a reply for an already-built system context (no DB access). Closing the
+        generator (aclose() or task cancellation) closes the HTTP stream, which makes
+        Ollama stop generating."""
+        started = time.perf_counter()
+        stream = await self.get_async_client().chat(
             model=self.model,
-            messages=messages,
+            messages=self._build_messages(system_context, prompt, history, summary),
             stream=True,
+            keep_alive=self.keep_alive,
         )
-
-        for chunk in stream:
-            yield chunk['message']['content']
+        first = True
+        try:
+            async for chunk in stream:
+                if first:
+                    first = False
+                    self._ttft.append((time.perf_counter() - started, self.warmed_up))
+                if _chunk_field(chunk, 'done'):
+                    self._record_prompt_eval(chunk)
+                yield chunk['message']['content']
+        finally:
+            await stream.aclose()
+
+    def get_async_client(self):
+        if self._async_client is None:
+            self._async_client = ollama.AsyncClient()
+        return self._async_client
+
+    def _record_prompt_eval(self, chunk):
+        # Ollama reports only the tokens it had to evaluate; a reused prefix is not counted
+        evaluated = _chunk_field(chunk, 'prompt_eval_count')
+        if evaluated is not None:
+            self._prompt_eval.append(evaluated)
+
+    def get_latency_stats(self) -> dict:
+        """Time to first token, split by whether warm-up had finished"""
+        def summarize(values):
+            values = sorted(values)
+            if not values:
+                return {"count": 0, "p50_ms": None, "p95_ms": None, "max_ms": None}
+            pick = lambda q: round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1)
+            return {"count": len(values), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "max_ms": round(values[-1] * 1000, 1)}
+
+        samples = list(self._ttft)
+        evaluated = list(self._prompt_eval)
+        return {
+            "model": self.model,
+            "keep_alive": self.keep_alive,
+            "warmed_up": self.warmed_up,
+            "ttft_before_warmup": summarize([s for s, warm in samples if not warm]),
+            "ttft_after_warmup": summarize([s for s, warm in samples if warm]),
+            "avg_prompt_tokens_evaluated": sum(evaluated) / len(evaluated) if evaluated else None,
+        }
@@ -0,0 +1,220 @@
+"""
+Categorizer - Suggests a category for a description, learned from the ledger.
+
+Each description is normalised to features: its word tokens, adjacent-word
+bigrams, and the whole token string as a merchant key. The in-memory index
+maps every feature to how often it was seen per category. It is built from
+the transactions table in a worker thread at startup (again on demand after
+reload() drops it for a large import), then kept current by
+ledger_events.committed(), like the ledger snapshot. Rebuilds read and
+tokenize without holding the lock lookups take, so async code never waits on
+a rebuild.
+
+A lookup is a handful of dict reads. Each matched feature votes for
+categories in proportion to its counts, with the merchant key weighted above
+bigrams and bigrams above single tokens. Confidence is the winning
+category's share of those votes.
+"""
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import String, cast, select
+from sqlalchemy.orm import Session
+
+from app.db.database import ReadSessionLocal
+from app.models.transaction import Transaction
+
+MIN_CONFIDENCE = float(os.getenv("CATEGORIZER_MIN_CONFIDENCE", "0.6"))
+WEIGHTS = {"merchant": 3.0, "bigram": 2.0, "token": 1.0}
+REBUILD_ATTEMPTS = 5
+
+_TOKEN_RE = re.compile(r"[a-z]{2,}")
+# Bank-statement noise and filler words that say nothing about the category
+STOPWORDS = {
+    "upi", "pos", "neft", "imps", "rtgs", "ach", "ecs", "ref", "txn", "payment", "paid", "transfer", "via",
+    "to", "from", "the", "and", "for", "of", "at", "in", "on", "by", "ltd", "pvt", "india", "www", "com",
+}
+
+
+def _field(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def _category_key(value) -> Optional[str]:
+    if value is None:
+        return None
+    return str(value if isinstance(value, uuid.UUID) else uuid.UUID(str(value)))
+
+
+def tokens(description: str) -> list:
+    return [t for t in _TOKEN_RE.findall((description or "").lower()) if t not in STOPWORDS]
+
+
+def features(description: str) -> list:
+    """(kind, feature) pairs for a description"""
+    words = tokens(description)
+    if not words:
+        return []
+    found = [("merchant", "=" + " ".join(words))]
+    found.extend(("bigram", f"{a} {b}") for a, b in zip(words, words[1:]))
+    found.extend(("token", word) for word in dict.fromkeys(words))
+    return found
+
+
+def _learn(index: dict, description: str, category_id: str, delta: int):
+    for _, feature in features(description):
+        counts = index.setdefault(feature, {})
+        count = counts.get(category_id, 0) + delta
+        if count > 0:
+            counts[category_id] = count
+        else:
+            counts.pop(category_id, None)
+            if not counts:
+                del index[feature]
+
+
+class Categorizer:
+    def __init__(self):
+        self._lock = threading.RLock()  # guards the index; only held for in-memory work
+        self._rebuild_lock = threading.RLock()  # one DB reload at a time
+        self._generation = 0  # bumped by invalidate() and by changes that arrive mid-rebuild
+        self._reading = False
+        self._reset()
+        self.stats = {"lookups": 0, "suggested": 0}
+
+    def _reset(self):
+        self.loaded = False
+        self._index = {}  # feature -> {category_id: count}
+        self.learned = 0
+        self.last_rebuild_at = None
+        self.last_rebuild_seconds = None
+
+    # --- Maintenance ---
+
+    def rebuild(self, db: Session) -> bool:
+        """Relearn from every transaction in the DB.
+
+        The read and tokenizing run without the lock, then the new index is swapped in. Counts
+        can't be patched by row id, so a change reported meanwhile discards the result instead
+        (returns False) and the caller may retry.
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                self._generation += 1
+                generation = self._generation
+                self._reading = True
+            try:
+                started = time.perf_counter()
+                index = {}
+                learned = 0
+                # Read UUIDs as text; each distinct one is parsed once into canonical form
+                stmt = select(Transaction.description, cast(Transaction.category_id, String)).execution_options(yield_per=10000)
+                canonical = {None: None}
+                for description, category_id in db.execute(stmt):
+                    if category_id not in canonical:
+                        canonical[category_id] = _category_key(category_id)
+                    if canonical[category_id] is not None:
+                        _learn(index, description, canonical[category_id], 1)
+                        learned += 1
+            finally:
+                with self._lock:
+                    self._reading = False
+            with self._lock:
+                if generation != self._generation:
+                    return False
+                self._index = index
+                self.learned = learned
+                self.loaded = True
+                self.last_rebuild_at = datetime.utcnow()
+                self.last_rebuild_seconds = round(time.perf_counter() - started, 4)
+                return True
+
+    def ensure_loaded(self, db: Session, attempts: int = REBUILD_ATTEMPTS) -> bool:
+        """Load the index if needed. Blocking: call from a worker thread, never the event loop."""
+        for _ in range(attempts):
+            if self.loaded:
+                return True
+            with self._rebuild_lock:
+                if not self.loaded:
+                    self.rebuild(db)
+        return self.loaded
+
+    def invalidate(self):
+        """Drop the index; the next lookup that passes a session relearns it"""
+        with self._lock:
+            self._generation += 1
+            self._reset()
+
+    def apply_changes(self, added: Iterable = (), removed: Iterable = ()):
+        """Unlearn removed rows and learn added ones (an update is both)"""
+        with self._lock:
+            if self._reading:
+                self._generation += 1  # the running rebuild may or may not have read these
+            if not self.loaded:
+                return
+            for rows, delta in ((removed, -1), (added, 1)):
+                for row in rows:
+                    category_id = _category_key(_field(row, "category_id"))
+                    if category_id is not None:
+                        _learn(self._index, _field(row, "description"), category_id, delta)
+                        self.learned += delta
+
+    # --- Queries ---
+
+    def suggest(self, description: str, limit: int = 3) -> List[dict]:
+        """Ranked {category_id, confidence, support}; empty when nothing matches or not loaded"""
+        with self._lock:
+            self.stats["lookups"] += 1
+            votes = {}
+            support = {}
+            total_weight = 0.0
+            for kind, feature in features(description):
+                counts = self._index.get(feature)
+                if not counts:
+                    continue
+                weight = WEIGHTS[kind]
+                total_weight += weight
+                seen = sum(counts.values())
+                for category_id, count in counts.items():
+                    votes[category_id] = votes.get(category_id, 0.0) + weight * count / seen
+                    support[category_id] = support.get(category_id, 0) + count
+        if not votes:
+            return []
+        ranked = sorted(votes.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [
+            {"category_id": category_id, "confidence": round(score / total_weight, 4), "support": support[category_id]}
+            for category_id, score in ranked
+        ]
+
+    def best(self, description: str, min_confidence: float = MIN_CONFIDENCE) -> Optional[str]:
+        """The top category id if it clears `min_confidence`, else None"""
+        suggestions = self.suggest(description, limit=1)
+        if suggestions and suggestions[0]["confidence"] >= min_confidence:
+            self.stats["suggested"] += 1
+            return suggestions[0]["category_id"]
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "features": len(self._index),
+                "transactions_learned": self.learned,
+                "last_rebuild_at": self.last_rebuild_at,
+                "last_rebuild_seconds": self.last_rebuild_seconds,
+                **self.stats,
+            }
+
+
+categorizer = Categorizer()
+
+
+def preload():
+    """Load the index with its own session (for startup and worker threads)"""
+    with ReadSessionLocal() as db:
+        categorizer.ensure_loaded(db)
@@ -0,0 +1,302 @@
+"""
+Context Builder - Assembles the chat system prompt under a token budget.
+
+Instead of pasting every goal, recurring rule and category into the prompt,
+each data section is summarised (month-to-date spend per category from the
+rollups, goal completion %, monthly cost of recurring rules) and trimmed to
+its own token budget, most useful lines first. Category IDs are only listed
+for categories the user's message mentions; the rest are named without IDs.
+
+`collect()` does the DB work and is cached by AIService per data version;
+`assemble()` is cheap and runs per message. The static header and
+instructions always come first (STATIC_PREFIX) so the prompt prefix is
+byte-identical across requests. Token counts are estimated at
+~4 characters per token, which is close enough for budgeting Llama prompts.
+"""
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.models.category import Category
+from app.models.goal import Goal
+from app.models.recurring import RecurringExpense
+from app.models.transaction import Transaction
+from app.models.transaction_rollup import TransactionRollup
+
+CHARS_PER_TOKEN = 4
+SECTION_BUDGETS = {
+    "spending": int(os.getenv("AI_CONTEXT_SPENDING_TOKENS", "200")),
+    "recent_transactions": int(os.getenv("AI_CONTEXT_RECENT_TOKENS", "150")),
+    "goals": int(os.getenv("AI_CONTEXT_GOALS_TOKENS", "150")),
+    "recurring": int(os.getenv("AI_CONTEXT_RECURRING_TOKENS", "120")),
+    "categories": int(os.getenv("AI_CONTEXT_CATEGORIES_TOKENS", "200")),
+}
+RECENT_LIMIT = 10
+GOALS_LIMIT = 25
+RECURRING_LIMIT = 25
+MONTHLY_FACTOR = {"Weekly": 52 / 12, "Monthly": 1.0, "Quarterly": 1 / 3, "Yearly": 1 / 12}
+
+HEADER = "You are a fast and helpful financial assistant for an INDIAN user. Currency is always INR (₹)."
+
+INSTRUCTIONS = """INSTRUCTIONS:
+1. BE PROACTIVE: When user says something like "add expense food 100" or "spent 100 on food", just DO IT immediately.
+2. DO NOT ask unnecessary questions. If user gives amount and category, act immediately.
+3. For simple commands, infer missing details intelligently:
+   - "add food 100" -> amount=100, description="food", find category with name containing "food"
+   - "spent 500 on groceries" -> amount=-500, description="groceries", find matching category
+   - "add expense chai 50" -> amount=-50, description="chai", use food category
+
+4. ONLY ask questions if critical info is truly missing (like amount or description).
+
+5. When executing an action, output JSON wrapped in markdown code blocks:
+
+For adding expense/transaction:
+```json
+{
+  "action": "add_transaction",
+  "data": {
+    "amount": -100,
+    "description": "food",
+    "category_id": "USE_ACTUAL_UUID_FROM_CATEGORIES"
+  }
+}
+```
+
+For adding income:
+```json
+{
+  "action": "add_transaction",
+  "data": {
+    "amount": 5000,
+    "description": "salary",
+    "category_id": "USE_ACTUAL_UUID_FROM_CATEGORIES"
+  }
+}
+```
+
+For creating goals:
+```json
+{
+  "action": "create_goal",
+  "data": {
+    "name": "Vacation",
+    "target_amount": 50000
+  }
+}
+```
+
+IMPORTANT RULES:
+- Expenses are NEGATIVE amounts, Income is POSITIVE
+- Use the category's actual ID when Available Categories lists one
+- For a category listed without an ID, give its name instead of "category_id": "category": "Food"
+- If category name contains what user said (food, transport, etc), use that category
+- Respond naturally but take action immediately when possible
+- DO NOT output JSON for read-only queries (like "how much did I spend")"""
+
+# Identical on every request, so Ollama can reuse its KV cache for this prefix
+# and only evaluate the data sections that follow
+STATIC_PREFIX = HEADER + "\n\n" + INSTRUCTIONS
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _money(value: float) -> str:
+    return f"₹{value:,.0f}"
+
+
+def collect(db: Session, today=None) -> dict:
+    """Run the (bounded) queries the context needs. Cache the result per data version."""
+    today = today or datetime.now().date()
+    month = today.strftime("%Y-%m")
+
+    categories = [
+        {"id": str(c.id), "name": c.name, "is_income": bool(c.is_income)}
+        for c in db.query(Category.id, Category.name, Category.is_income).order_by(Category.name)
+    ]
+    names = {c["id"]: c["name"] for c in categories}
+
+    spending = [
+        {"category": names.get(str(category_id), "Uncategorized"), "expense": expense, "income": income, "count": count}
+        for category_id, expense, income, count in
+        db.query(TransactionRollup.category_id, TransactionRollup.expense, TransactionRollup.income, TransactionRollup.count)
+        .filter(TransactionRollup.month == month)
+        .order_by(TransactionRollup.expense.desc())
+    ]
+
+    recent = [
+        {"date": t.date.date(), "description": t.description, "amount": t.amount,
+         "category": names.get(str(t.category_id), "Uncategorized")}
+        for t in db.query(Transaction.date, Transaction.description, Transaction.amount, Transaction.category_id)
+        .order_by(Transaction.date.desc())
+        .limit(RECENT_LIMIT)
+    ]
+
+    goal_count, goal_saved, goal_target = db.query(
+        func.count(Goal.id), func.coalesce(func.sum(Goal.current_amount), 0.0), func.coalesce(func.sum(Goal.target_amount), 0.0)
+    ).one()
+    goals = [
+        {"name": g.name, "current": g.current_amount or 0.0, "target": g.target_amount or 0.0, "deadline": g.deadline}
+        for g in db.query(Goal.name, Goal.current_amount, Goal.target_amount, Goal.deadline)
+        .order_by(case((Goal.deadline.is_(None), 1), else_=0), Goal.deadline)
+        .limit(GOALS_LIMIT)
+    ]
+
+    active = RecurringExpense.is_active.isnot(False)
+    by_frequency = db.query(RecurringExpense.frequency, func.count(RecurringExpense.id), func.sum(RecurringExpense.amount)) \
+        .filter(active).group_by(RecurringExpense.frequency).all()
+    recurring = [
+        {"name": r.name, "amount": r.amount or 0.0, "frequency": r.frequency, "next_due": r.next_due_date}
+        for r in db.query(RecurringExpense.name, RecurringExpense.amount, RecurringExpense.frequency, RecurringExpense.next_due_date)
+        .filter(active)
+        .order_by(RecurringExpense.amount.desc())
+        .limit(RECURRING_LIMIT)
+    ]
+
+    return {
+        "month": month,
+        "categories": categories,
+        "spending": spending,
+        "recent": recent,
+        "goals": goals,
+        "goal_totals": {"count": goal_count, "saved": goal_saved, "target": goal_target},
+        "recurring": recurring,
+        "recurring_totals": [
+            {"frequency": frequency, "count": count, "amount": abs(amount or 0.0)} for frequency, count, amount in by_frequency
+        ],
+    }
+
+
+def _fit(title: str, lines: list, budget: int, summary: str = None, total: int = None):
+    """Title, optional summary line, then as many lines as the budget allows.
+    `total` is the full item count when `lines` is already a truncated query.
+    Returns (text, number of lines kept)."""
+    total = len(lines) if total is None else total
+    head = [title] + ([summary] if summary else [])
+    used = estimate_tokens("\n".join(head))
+    kept = []
+    included = 0
+    for i, line in enumerate(lines):
+        cost = estimate_tokens(line) + 1
+        remaining = total - i - 1
+        # Reserve room for the "... N more" marker unless this is the last line
+        reserve = estimate_tokens(f"- ... {remaining} more") + 1 if remaining else 0
+        if used + cost + reserve > budget:
+            break
+        kept.append(line)
+        included += 1
+        used += cost
+    if included < total:
+        kept.append(f"- ... {total - included} more")
+    if not lines:
+        kept.append("- none")
+    return "\n".join(head + kept), included
+
+
+def _words(text: str) -> set:
+    words = set(_WORD_RE.findall(text.lower()))
+    return words | {w[:-1] for w in words if len(w) > 3 and w.endswith("s")}
+
+
+def relevant_categories(categories: list, message: str) -> list:
+    """Categories whose name, or a word of it, appears in the message"""
+    if not message:
+        return []
+    lowered = message.lower()
+    words = _words(message)
+    matches = []
+    for category in categories:
+        name = category["name"].lower()
+        name_words = {w for w in _WORD_RE.findall(name) if len(w) >= 3}
+        if name in lowered or name_words & words:
+            matches.append(category)
+    return matches
+
+
+def _section_spending(data, budget):
+    rows = data["spending"]
+    expense = sum(r["expense"] for r in rows)
+    income = sum(r["income"] for r in rows)
+    summary = f"Total: spent {_money(expense)}, earned {_money(income)}, net {_money(income - expense)}"
+    lines = [f"- {r['category']}: spent {_money(r['expense'])} ({r['count']} txns)" for r in rows if r["expense"]]
+    text, included = _fit(f"Month-to-date ({data['month']}) by category:", lines, budget, summary)
+    return text, len(lines), included
+
+
+def _section_recent(data, budget):
+    lines = [f"- {t['date']}: {t['description']} ({t['amount']}) [{t['category']}]" for t in data["recent"]]
+    text, included = _fit("Recent Transactions:", lines, budget)
+    return text, len(lines), included
+
+
+def _section_goals(data, budget):
+    totals = data["goal_totals"]
+    summary = None
+    if totals["count"]:
+        overall = totals["saved"] / totals["target"] * 100 if totals["target"] else 0.0
+        summary = f"{totals['count']} goals, {_money(totals['saved'])} of {_money(totals['target'])} saved ({overall:.0f}%)"
+    lines = []
+    for g in data["goals"]:
+        pct = g["current"] / g["target"] * 100 if g["target"] else 0.0
+        due = f", due {g['deadline'].date()}" if g["deadline"] else ""
+        lines.append(f"- {g['name']}: {pct:.0f}% ({_money(g['current'])}/{_money(g['target'])}{due})")
+    text, included = _fit("Financial Goals:", lines, budget, summary, total=totals["count"])
+    return text, totals["count"], included
+
+
+def _section_recurring(data, budget):
+    monthly = sum(t["amount"] * MONTHLY_FACTOR.get(t["frequency"], 0.0) for t in data["recurring_totals"])
+    count = sum(t["count"] for t in data["recurring_totals"])
+    summary = f"{count} active, about {_money(monthly)} per month" if count else None
+    lines = [f"- {r['name']}: {r['amount']} ({r['frequency']})" for r in data["recurring"]]
+    text, included = _fit("Recurring Expenses:", lines, budget, summary, total=count)
+    return text, count, included
+
+
+def _section_categories(data, budget, message):
+    relevant = relevant_categories(data["categories"], message)
+    relevant_ids = {c["id"] for c in relevant}
+    lines = [f"- '{c['name']}' (ID: {c['id']})" for c in relevant]
+    text, included = _fit("Available Categories:", lines, budget) if lines else ("Available Categories:", 0)
+
+    # Spend what is left of the budget naming the others, without IDs
+    others = [c["name"] for c in data["categories"] if c["id"] not in relevant_ids]
+    if others:
+        prefix = "- Others (name the category instead of an ID): "
+        left = budget - estimate_tokens(text) - estimate_tokens(prefix) - 4
+        names = []
+        for name in others:
+            cost = estimate_tokens(name + ", ")
+            if cost > left:
+                break
+            names.append(name)
+            left -= cost
+        if len(names) < len(others):
+            names.append(f"+{len(others) - len(names)} more")
+        text += "\n" + prefix + ", ".join(names)
+    return text, len(data["categories"]), included
+
+
+def assemble(data: dict, message: str = "", budgets: dict = None):
+    """Render the system prompt for one message. Returns (prompt, per-section token report)."""
+    budgets = {**SECTION_BUDGETS, **(budgets or {})}
+    sections = [
+        ("spending", _section_spending(data, budgets["spending"])),
+        ("recent_transactions", _section_recent(data, budgets["recent_transactions"])),
+        ("goals", _section_goals(data, budgets["goals"])),
+        ("recurring", _section_recurring(data, budgets["recurring"])),
+        ("categories", _section_categories(data, budgets["categories"], message)),
+    ]
+    # Static text first, volatile data after it
+    parts = [STATIC_PREFIX]
+    report = [{"section": "instructions", "tokens": estimate_tokens(STATIC_PREFIX), "budget": None, "items": None, "included": None}]
+    for name, (text, items, included) in sections:
+        parts.append(text)
+        report.append({"section": name, "tokens": estimate_tokens(text), "budget": budgets[name], "items": items, "included": included})
+    return "\n\n".join(parts), report
@@ -0,0 +1,219 @@
+"""
+Conversation Memory - Keeps chat history in the prompt at a fixed size.
+
+A prompt carries the session's rolling summary plus as many recent turns as
+fit in AI_HISTORY_TOKENS, newest first; very long messages are clipped to
+AI_HISTORY_MESSAGE_TOKENS before they are counted. When turns no longer fit,
+a background summarisation call folds the oldest of them into the stored
+summary (ChatSummary) once the reply is saved. It leaves only about half the
+budget of recent turns unsummarised, so it runs every few turns rather than
+on every message. Prompt size therefore stays flat however long a session
+gets.
+
+Compaction takes a generation slot like any chat and is skipped, to be
+retried on a later turn, when the queue is full.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import AsyncSessionLocal
+from app.models.chat import ChatSummary
+from app.services.context_builder import estimate_tokens
+from app.services.generation_scheduler import QueueFull, generation_scheduler
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TOKENS = int(os.getenv("AI_HISTORY_TOKENS", "800"))
+SUMMARY_TOKENS = int(os.getenv("AI_SUMMARY_TOKENS", "200"))
+MESSAGE_TOKENS = int(os.getenv("AI_HISTORY_MESSAGE_TOKENS", "300"))
+FETCH_LIMIT = 40  # newest unsummarised messages looked at per prompt
+COMPACT_CHUNK_TOKENS = 1500  # transcript sent per summarisation call
+MAX_COMPACTION_ROUNDS = 10
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators
+KEEP_MIN_MESSAGES = 2
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and their personal finance assistant. "
+    "Merge the new messages into the summary so far. Keep facts the assistant may need later: amounts, "
+    "categories, goals, decisions, transactions that were added and open questions. Drop greetings and "
+    "small talk. Write plain sentences, at most {words} words, and output only the summary."
+)
+
+stats = {"compactions": 0, "summarized_messages": 0, "skipped": 0, "failures": 0}
+_running = set()  # (section, session_id) currently being compacted
+_tasks = set()  # strong references so background tasks are not garbage collected
+
+
+def clip(content: str, max_tokens: int = MESSAGE_TOKENS) -> str:
+    limit = max_tokens * 4
+    if len(content) <= limit:
+        return content
+    return content[:limit].rstrip() + " …"
+
+
+def message_tokens(message) -> int:
+    return estimate_tokens(clip(message.content)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _after(query, MessageModel, summary: Optional[ChatSummary]):
+    """Only messages newer than what the summary already covers (a row-value seek on the session index)"""
+    if summary is None or summary.covered_until is None:
+        return query
+    key = tuple_(MessageModel.created_at, MessageModel.id)
+    return query.where(key > (summary.covered_until, summary.covered_message_id))
+
+
+async def get_summary(db: AsyncSession, section: str, session_id: str) -> Optional[ChatSummary]:
+    return await db.scalar(
+        select(ChatSummary).where(ChatSummary.section == section.lower(), ChatSummary.session_id == session_id)
+    )
+
+
+async def delete_summary(db: AsyncSession, section: str, session_id: str):
+    await db.execute(
+        delete(ChatSummary).where(ChatSummary.section == section.lower(), ChatSummary.session_id == session_id)
+    )
+
+
+def _newest_unsummarized(MessageModel, session_id: str, summary, limit: int, exclude_id: Optional[str] = None):
+    query = select(MessageModel).where(MessageModel.session_id == session_id)
+    if exclude_id is not None:
+        query = query.where(MessageModel.id != exclude_id)
+    query = _after(query, MessageModel, summary)
+    return query.order_by(MessageModel.created_at.desc(), MessageModel.id.desc()).limit(limit)
+
+
+async def load(db: AsyncSession, MessageModel, section: str, session_id: str, exclude_id: Optional[str] = None) -> dict:
+    """Summary and recent turns for the next prompt, within HISTORY_TOKENS.
+
+    `needs_compaction` is set when unsummarised turns were left out.
+    """
+    summary = await get_summary(db, section, session_id)
+    summary_text = summary.content if summary is not None and summary.content else None
+    messages = (await db.scalars(
+        _newest_unsummarized(MessageModel, session_id, summary, FETCH_LIMIT + 1, exclude_id)
+    )).all()
+
+    used = estimate_tokens(summary_text) if summary_text else 0
+    history = []
+    for message in messages[:FETCH_LIMIT]:
+        cost = message_tokens(message)
+        if used + cost > HISTORY_TOKENS:
+            break
+        history.append({"role": message.role, "content": clip(message.content)})
+        used += cost
+    return {
+        "summary": summary_text,
+        "history": history[::-1],  # chronological
+        "tokens": used,
+        "needs_compaction": len(history) < len(messages),
+    }
+
+
+async def summarize(ai_service, previous: str, messages: list) -> str:
+    transcript = "\n".join(f"{m.role}: {clip(m.content)}" for m in messages)
+    response = await ai_service.get_async_client().chat(
+        model=ai_service.model,
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT.format(words=SUMMARY_TOKENS * 3 // 4)},
+            {"role": "user", "content": f"Summary so far:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"},
+        ],
+        options={"num_predict": SUMMARY_TOKENS},
+        keep_alive=ai_service.keep_alive,
+    )
+    return clip(response["message"]["content"].strip(), SUMMARY_TOKENS)
+
+
+async def _compact_once(db: AsyncSession, ai_service, MessageModel, section: str, session_id: str) -> int:
+    """Fold the oldest unsummarised chunk into the summary. Returns the number of messages folded."""
+    summary = await get_summary(db, section, session_id)
+
+    # Leave the newest turns worth half the recent-turn budget (at least the last exchange) out of the summary
+    keep_budget = (HISTORY_TOKENS - SUMMARY_TOKENS) // 2
+    newest = (await db.scalars(_newest_unsummarized(MessageModel, session_id, summary, FETCH_LIMIT))).all()
+    used = 0
+    kept = 0
+    for message in newest:
+        used += message_tokens(message)
+        if used > keep_budget and kept >= KEEP_MIN_MESSAGES:
+            break
+        kept += 1
+    if kept == len(newest):
+        return 0
+    boundary = newest[kept]  # newest message that will be summarised
+
+    query = _after(select(MessageModel).where(MessageModel.session_id == session_id), MessageModel, summary)
+    query = query.where(tuple_(MessageModel.created_at, MessageModel.id) <= (boundary.created_at, boundary.id))
+    oldest = (await db.scalars(query.order_by(MessageModel.created_at, MessageModel.id).limit(FETCH_LIMIT))).all()
+    chunk = []
+    used = 0
+    for message in oldest:
+        used += message_tokens(message)
+        if chunk and used > COMPACT_CHUNK_TOKENS:
+            break
+        chunk.append(message)
+    if not chunk:
+        return 0
+
+    content = await summarize(ai_service, summary.content if summary is not None else "", chunk)
+    if summary is None:
+        summary = ChatSummary(section=section.lower(), session_id=session_id, message_count=0)
+        db.add(summary)
+    summary.content = content
+    summary.covered_until = chunk[-1].created_at
+    summary.covered_message_id = chunk[-1].id
+    summary.message_count = (summary.message_count or 0) + len(chunk)
+    summary.updated_at = datetime.utcnow()
+    await db.commit()
+    return len(chunk)
+
+
+async def compact(ai_service, MessageModel, section: str, session_id: str):
+    """Summarise older turns until the unsummarised rest fits comfortably"""
+    key = (section.lower(), session_id)
+    if key in _running:
+        return
+    try:
+        ticket = generation_scheduler.submit(("summary",) + key)
+    except QueueFull:
+        stats["skipped"] += 1
+        return
+    _running.add(key)
+    try:
+        async for _ in generation_scheduler.wait(ticket):
+            pass
+        async with AsyncSessionLocal() as db:
+            for _ in range(MAX_COMPACTION_ROUNDS):
+                folded = await _compact_once(db, ai_service, MessageModel, section, session_id)
+                if not folded:
+                    break
+                stats["compactions"] += 1
+                stats["summarized_messages"] += folded
+    except Exception as e:
+        stats["failures"] += 1
+        logger.warning("Summarising chat %s failed: %s", session_id, e)
+    finally:
+        generation_scheduler.release(ticket)
+        _running.discard(key)
+
+
+def schedule(ai_service, MessageModel, section: str, session_id: str):
+    """Run compact() in the background"""
+    task = asyncio.get_running_loop().create_task(compact(ai_service, MessageModel, section, session_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def snapshot() -> dict:
+    return {
+        "history_tokens": HISTORY_TOKENS,
+        "summary_tokens": SUMMARY_TOKENS,
+        "running": len(_running),
+        **stats,
+    }
@@ -0,0 +1,145 @@
+"""
+CSV Import Service - Streams bank exports into the ledger in fixed-size batches.
+
+Rows are parsed one at a time from the upload, validated against a preloaded
+category map and inserted with Core executemany, so memory stays bounded by the
+batch size rather than the file size. Bad rows are reported, not fatal.
+Rows without a category get one from the learned categorizer when it is
+confident enough.
+"""
+import csv
+import math
+import uuid
+from datetime import datetime
+from typing import IO
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.services import ledger_events
+from app.services.categorizer import categorizer
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+DATE_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d/%m/%Y %H:%M:%S")
+
+
+def load_category_map(db: Session) -> dict:
+    """Map both category UUID strings and lower-cased names to category ids"""
+    mapping = {}
+    for category_id, name in db.query(Category.id, Category.name):
+        mapping[str(category_id)] = category_id
+        mapping[category_id.hex] = category_id
+        mapping[name.strip().lower()] = category_id
+    return mapping
+
+
+def parse_date(value: str) -> datetime:
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date '{value}'")
+
+
+def parse_amount(value: str) -> float:
+    amount = float(value.replace(",", ""))
+    # float() accepts "nan" and "inf", which would poison every sum they reach
+    if not math.isfinite(amount):
+        raise ValueError(f"Amount '{value.strip()}' is not a number")
+    return amount
+
+
+def parse_row(row: dict, categories: dict, suggest=None) -> dict:
+    """Validate one CSV row and return insert parameters. Raises ValueError/KeyError.
+
+    `suggest(description)` fills in a category id for rows that have none.
+    """
+    raw_category = (row.get("CategoryID") or row.get("Category") or "").strip()
+    if not raw_category and suggest is None:
+        raise KeyError("CategoryID")
+    category_id = None
+    if raw_category:
+        category_id = categories.get(raw_category) or categories.get(raw_category.lower())
+        if category_id is None:
+            raise ValueError(f"Unknown category '{raw_category}'")
+
+    description = (row["Description"] or "").strip()
+    if not description:
+        raise ValueError("Description is empty")
+
+    params = {
+        "id": uuid.uuid4(),
+        "date": parse_date(row["Date"]),
+        "amount": parse_amount(row["Amount"]),
+        "description": description[:255],
+        "category_id": category_id,
+        "notes": (row.get("Notes") or None),
+    }
+    if category_id is None:
+        # Last, so only otherwise-valid rows are counted as auto-categorized
+        params["category_id"] = suggest(description)
+        if params["category_id"] is None:
+            raise ValueError("No category given and none could be suggested")
+    return params
+
+
+def import_transactions(db: Session, stream: IO[str], batch_size: int = BATCH_SIZE) -> dict:
+    """Import a CSV text stream. Everything is committed once at the end."""
+    categories = load_category_map(db)
+    reader = csv.DictReader(stream)
+
+    def suggest(description):
+        nonlocal auto_categorized
+        categorizer.ensure_loaded(db)
+        category_id = categories.get(categorizer.best(description))
+        if category_id is not None:  # None too if the category was deleted since it was learned
+            auto_categorized += 1
+        return category_id
+
+    accepted = 0
+    auto_categorized = 0
+    rejected = 0
+    errors = []
+    batch = []
+
+    def flush():
+        if batch:
+            db.execute(insert(Transaction), batch)
+            ledger_events.apply(db, added=batch)
+            batch.clear()
+
+    for row in reader:
+        # Physical line the record ends on; quoted fields may span lines, so rows can't just be counted
+        line_no = reader.line_num
+        try:
+            batch.append(parse_row(row, categories, suggest))
+            accepted += 1
+        except KeyError as e:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": line_no, "error": f"Missing column {e}"})
+        except (ValueError, AttributeError) as e:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"row": line_no, "error": str(e)})
+
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    db.commit()
+
+    return {
+        "accepted": accepted,
+        "rejected": rejected,
+        "auto_categorized": auto_categorized,
+        "errors": errors,
+        "errors_truncated": rejected > len(errors),
+    }
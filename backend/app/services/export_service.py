@@ -0,0 +1,81 @@
+"""
+Export Service - Streams the ledger out as CSV or NDJSON.
+
+Rows come from a server-side cursor (yield_per) as plain tuples, so neither ORM
+objects nor Pydantic models are built and memory stays flat for any ledger size.
+"""
+import csv
+import io
+import json
+from typing import Generator
+
+from app.db.database import ReadSessionLocal
+from app.models.transaction import Transaction
+from app.services.transaction_query import TransactionFilters, ordered
+
+YIELD_PER = 1000
+CSV_HEADER = ["ID", "Date", "Amount", "Description", "CategoryID", "Notes", "ReceiptURL"]
+
+
+def _rows(filters: TransactionFilters):
+    # The response outlives the request's dependency scope, so the stream owns its session
+    db = ReadSessionLocal()
+    try:
+        query = db.query(
+            Transaction.id,
+            Transaction.date,
+            Transaction.amount,
+            Transaction.description,
+            Transaction.category_id,
+            Transaction.notes,
+            Transaction.receipt_url,
+        )
+        query = ordered(filters.apply(query), "asc").yield_per(YIELD_PER)
+        for row in query:
+            yield row
+    finally:
+        db.close()
+
+
+def stream_csv(filters: TransactionFilters) -> Generator[str, None, None]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+
+    pending = 0
+    for row in _rows(filters):
+        writer.writerow([
+            row.id,
+            row.date.isoformat(),
+            row.amount,
+            row.description,
+            row.category_id,
+            row.notes or "",
+            row.receipt_url or "",
+        ])
+        pending += 1
+        if pending >= YIELD_PER:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue()
+
+
+def stream_ndjson(filters: TransactionFilters) -> Generator[str, None, None]:
+    lines = []
+    for row in _rows(filters):
+        lines.append(json.dumps({
+            "id": str(row.id),
+            "date": row.date.isoformat(),
+            "amount": row.amount,
+            "description": row.description,
+            "category_id": str(row.category_id) if row.category_id else None,
+            "notes": row.notes,
+            "receipt_url": row.receipt_url,
+        }))
+        if len(lines) >= YIELD_PER:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,160 @@
+"""
+Fast Path - Handles simple ledger commands without the LLM.
+
+Messages like "add food 100", "spent 500 on groceries" or "chai ₹50" are
+matched against a small precompiled grammar. Without a verb ("add", "spent",
+"expense", ...) the amount needs a currency marker, so "bus 42" or "rent 2"
+are left to the model. The description is matched to a
+category by name, then by the learned categorizer, then through a few common
+aliases ("chai" -> a food category). A command is only taken when the amount parses and exactly one
+category fits (income vs expense included); everything else, questions
+and descriptions carrying a qualifier ("food in 2024", "groceries last 30")
+included, falls through to the model. Taken commands are executed through
+action_executor and answered with a templated reply.
+
+`stats` counts the messages considered (dashboard/avatar chat) and how many
+the fast path served.
+"""
+import re
+from typing import Optional
+
+from app.services import context_builder
+from app.services.categorizer import categorizer
+
+_AMOUNT = (
+    r"(?P<prefix>₹|rs\.?|inr)?\s*(?P<amount>\d+(?:,\d{2,3})*(?:\.\d{1,2})?)(?P<thousands>\s?k\b)?"
+    r"\s*(?P<suffix>₹|rs\.?|rupees?|inr|/-)?"
+)
+_DESCRIPTION = r"(?P<description>[a-z][a-z&' ]{0,40}?)"
+_ADD = r"(?:(?:please\s+)?(?P<verb>add|log|record|note)\s+)?"
+_KIND = r"(?:(?P<kind>expense|income)\s+(?:of\s+)?)?"
+_I = r"(?:i\s+)?"
+
+# (pattern, kind implied by the verb)
+GRAMMAR = [
+    (re.compile(rf"^{_ADD}{_KIND}{_DESCRIPTION}\s+(?:for\s+)?{_AMOUNT}$"), None),
+    (re.compile(rf"^{_ADD}{_KIND}{_AMOUNT}\s+(?:(?:on|for|in)\s+)?{_DESCRIPTION}$"), None),
+    (re.compile(rf"^{_I}(?:spent|paid|bought)\s+{_AMOUNT}\s+(?:on|for|in)\s+{_DESCRIPTION}$"), "expense"),
+    (re.compile(rf"^{_I}(?:spent|paid)\s+(?:on|for)\s+{_DESCRIPTION}\s+{_AMOUNT}$"), "expense"),
+    (re.compile(rf"^{_I}(?:received|earned|got)\s+{_AMOUNT}\s+(?:from|as|for)\s+{_DESCRIPTION}$"), "income"),
+]
+MAX_DESCRIPTION_WORDS = 4
+
+# Words that show the message is a question or request, not a command
+_NOT_A_COMMAND = {"how", "what", "when", "why", "which", "show", "list", "much", "many", "total", "goal", "budget", "delete", "remove"}
+# Prepositions and qualifiers that make the trailing number a year, limit or period rather than an amount
+# ("food in 2024", "food over 500", "groceries last 30")
+_QUALIFIERS = {"in", "on", "at", "to", "from", "by", "per", "over", "above", "under", "below", "than", "more", "less",
+               "last", "past", "next", "this", "since", "until", "till", "before", "after", "between", "during",
+               "within", "each", "every", "top", "day", "days", "week", "weeks", "month", "months", "year", "years"}
+
+# Common descriptions -> a word expected in the category's name
+ALIASES = {
+    "food": ["chai", "tea", "coffee", "lunch", "dinner", "breakfast", "snack", "snacks", "pizza", "burger",
+             "restaurant", "swiggy", "zomato", "meal", "biryani"],
+    "grocer": ["grocery", "groceries", "vegetables", "milk", "fruits", "kirana"],
+    "transport": ["uber", "ola", "taxi", "cab", "auto", "bus", "metro", "train", "petrol", "diesel", "fuel", "rapido"],
+    "shopping": ["amazon", "flipkart", "myntra", "clothes", "shoes"],
+    "entertainment": ["movie", "movies", "netflix", "hotstar", "spotify", "concert"],
+    "bill": ["electricity", "wifi", "internet", "recharge", "mobile", "rent"],
+    "health": ["medicine", "medicines", "doctor", "pharmacy", "hospital", "gym"],
+    "salary": ["salary", "paycheck", "payroll"],
+}
+_ALIAS_TARGETS = {word: target for target, words in ALIASES.items() for word in words}
+
+stats = {"messages": 0, "served": 0, "unmatched": 0, "ambiguous": 0}
+
+
+def _normalize(message: str) -> str:
+    return re.sub(r"\s+", " ", message.strip().lower()).rstrip(".!")
+
+
+def parse(message: str) -> Optional[dict]:
+    """Amount, description and kind (or None if the verb doesn't say) of a command.
+
+    Cheap enough to run on every message, before any categories are loaded.
+    """
+    command = _parse(message)
+    if command is None:
+        stats["unmatched"] += 1
+    return command
+
+
+def _parse(message: str) -> Optional[dict]:
+    text = _normalize(message)
+    if not text or "?" in text:
+        return None
+    for pattern, implied_kind in GRAMMAR:
+        match = pattern.match(text)
+        if match is None:
+            continue
+        description = match.group("description").strip()
+        words = description.split()
+        if not words or len(words) > MAX_DESCRIPTION_WORDS or (_NOT_A_COMMAND | _QUALIFIERS) & set(words):
+            return None
+        groups = match.groupdict()
+        # A bare "<word> <number>" may be anything; it needs a verb, "expense"/"income" or a currency
+        if not (implied_kind or groups.get("verb") or groups.get("kind") or groups["prefix"] or groups["suffix"]):
+            return None
+        amount = float(match.group("amount").replace(",", ""))
+        if match.group("thousands"):
+            amount *= 1000
+        if amount <= 0:
+            return None
+        kind = implied_kind or groups.get("kind")
+        return {"amount": amount, "description": description, "kind": kind}
+    return None
+
+
+def match_categories(description: str, categories: list) -> list:
+    """By category name, then what the user's history says (if the categorizer is loaded), then aliases"""
+    matches = context_builder.relevant_categories(categories, description)
+    if matches:
+        return matches
+    learned = categorizer.best(description)
+    if learned is not None:
+        return [c for c in categories if c["id"] == learned]
+    targets = {_ALIAS_TARGETS[word] for word in description.split() if word in _ALIAS_TARGETS}
+    return [c for c in categories if any(target in c["name"].lower() for target in targets)]
+
+
+def recognize(message: str, categories: list) -> Optional[dict]:
+    """An add_transaction action for a high-confidence command, else None"""
+    command = parse(message)
+    return resolve(command, categories) if command is not None else None
+
+
+def resolve(command: dict, categories: list) -> Optional[dict]:
+    """The add_transaction action for a parsed command, if exactly one category fits"""
+    matches = match_categories(command["description"], categories)
+    if command["kind"] is not None:
+        matches = [c for c in matches if c["is_income"] == (command["kind"] == "income")]
+    if len(matches) != 1:
+        stats["ambiguous"] += 1
+        return None
+    category = matches[0]
+    amount = command["amount"] if category["is_income"] else -command["amount"]
+    return {
+        "action": "add_transaction",
+        "data": {"amount": amount, "description": command["description"], "category_id": category["id"]},
+        "category": category["name"],
+    }
+
+
+def reply(action: dict, result: dict) -> str:
+    if result["status"] != "ok":
+        return f"I couldn't add that: {result['error']}"
+    amount = action["data"]["amount"]
+    kind = "income" if amount > 0 else "expense"
+    shown = f"{abs(amount):,.0f}" if float(amount).is_integer() else f"{abs(amount):,.2f}"
+    return f"Done! Added {kind} of ₹{shown} for {action['data']['description']} under {action['category']}."
+
+
+def record(served: bool):
+    stats["messages"] += 1
+    if served:
+        stats["served"] += 1
+
+
+def snapshot() -> dict:
+    return {**stats, "served_fraction": stats["served"] / stats["messages"] if stats["messages"] else 0.0}
@@ -0,0 +1,158 @@
+"""
+Forecast Service - Projects the daily balance forward from recurring rules.
+
+The projection starts from today's balance (ledger snapshot) and adds three
+flows per day:
+
+- recurring: every occurrence of every active recurring expense, expanded with
+  recurring_service.expand(); occurrences already overdue land on tomorrow
+- scheduled: transactions already in the ledger with a future date
+- discretionary: optional trailing-average daily spend, excluding recurring
+  bookings, so day-to-day spending is not ignored
+
+Flows are binned per day with np.bincount and accumulated with np.cumsum.
+Results are cached per parameter set until ledger_events or the recurring
+routes call invalidate(), or the day changes. Parameters come from the client,
+so the cache is an LRU capped at FORECAST_CACHE_SIZE entries, and entries for
+other days are dropped whenever a new result is stored.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.category import Category
+from app.models.recurring import RecurringExpense
+from app.services import recurring_service
+from app.services.ledger_snapshot import ledger_snapshot
+
+MAX_CACHED = int(os.getenv("FORECAST_CACHE_SIZE", "32"))
+
+_cache = OrderedDict()  # (day, months, granularity, trailing_days) -> result
+_generation = 0
+_lock = threading.Lock()
+
+
+def invalidate():
+    global _generation
+    with _lock:
+        _cache.clear()
+        _generation += 1
+
+
+def _add_months(day: date, months: int) -> date:
+    month = np.datetime64(day, "M") + months
+    last_day = ((month + 1).astype("datetime64[D]") - np.timedelta64(1, "D")).astype(date).day
+    return month.astype(date).replace(day=min(day.day, last_day))
+
+
+def _discretionary_per_day(db: Session, today: date, trailing_days: int) -> float:
+    if trailing_days <= 0:
+        return 0.0
+    start = datetime.combine(today - timedelta(days=trailing_days - 1), datetime.min.time())
+    end = datetime.combine(today + timedelta(days=1), datetime.min.time())
+    recurring_category = (
+        db.query(Category.id).filter(Category.name == recurring_service.RECURRING_CATEGORY).scalar()
+    )
+    spent = sum(
+        row["expense"] for row in ledger_snapshot.by_category(start, end)
+        if row["category_id"] != recurring_category
+    )
+    return spent / trailing_days
+
+
+def build(db: Session, today: date, months: int, granularity: str, trailing_days: int) -> dict:
+    start_day = today + timedelta(days=1)
+    horizon = _add_months(start_day, months)  # exclusive
+    days = np.arange(np.datetime64(start_day, "D"), np.datetime64(horizon, "D"))
+    first = days[0] if len(days) else np.datetime64(start_day, "D")
+    size = len(days)
+
+    ledger_snapshot.ensure_loaded(db)
+    tomorrow = datetime.combine(start_day, datetime.min.time())
+    starting_balance = ledger_snapshot.range_sum(None, tomorrow)["total"]
+
+    # Recurring rules -> occurrence stream
+    rules = (
+        db.query(RecurringExpense.amount, RecurringExpense.frequency, RecurringExpense.next_due_date,
+                 RecurringExpense.anchor_day)
+        .filter(RecurringExpense.is_active.isnot(False))
+        .filter(RecurringExpense.next_due_date.isnot(None))
+        .filter(RecurringExpense.frequency.in_(recurring_service.FREQUENCIES))
+        .all()
+    )
+    recurring = np.zeros(size)
+    if rules and size:
+        rule_index, occurrences, _ = recurring_service.expand(
+            [r.next_due_date for r in rules], [r.frequency for r in rules], horizon - timedelta(days=1),
+            [r.anchor_day for r in rules],
+        )
+        amounts = -np.abs(np.array([r.amount or 0.0 for r in rules], dtype=np.float64))
+        slots = np.maximum((occurrences.astype("datetime64[D]") - first).astype(np.int64), 0)
+        recurring = np.bincount(slots, weights=amounts[rule_index], minlength=size)[:size]
+
+    # Future-dated transactions already in the ledger
+    scheduled = np.zeros(size)
+    future_days, future_totals = ledger_snapshot.daily_totals(tomorrow, datetime.combine(horizon, datetime.min.time()))
+    scheduled[(future_days - first).astype(np.int64)] = future_totals
+
+    per_day = _discretionary_per_day(db, today, trailing_days)
+    discretionary = np.full(size, -per_day)
+
+    balance = starting_balance + np.cumsum(recurring + scheduled + discretionary)
+
+    if granularity == "monthly" and size:
+        month_keys = days.astype("datetime64[M]")
+        starts = np.flatnonzero(np.r_[True, month_keys[1:] != month_keys[:-1]])
+        ends = np.r_[starts[1:], size] - 1
+        periods = [str(m) for m in month_keys[starts]]
+        recurring, scheduled, discretionary = (np.add.reduceat(a, starts) for a in (recurring, scheduled, discretionary))
+        balance = balance[ends]
+    else:
+        periods = [str(d) for d in days]
+
+    points = [
+        {
+            "period": period,
+            "recurring": float(r),
+            "scheduled": float(s),
+            "discretionary": float(d),
+            "balance": float(b),
+        }
+        for period, r, s, d, b in zip(periods, recurring, scheduled, discretionary, balance)
+    ]
+    return {
+        "as_of": today,
+        "granularity": granularity,
+        "starting_balance": float(starting_balance),
+        "daily_discretionary": float(per_day),
+        "points": points,
+        "generated_at": datetime.now(),
+    }
+
+
+def forecast(db: Session, months: int = 12, granularity: str = "daily", trailing_days: int = 90,
+             today: Optional[date] = None) -> dict:
+    today = today or datetime.now().date()
+    key = (today, months, granularity, trailing_days)
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+        generation = _generation
+    if cached is not None:
+        return cached
+    result = build(db, today, months, granularity, trailing_days)
+    with _lock:
+        # A write that landed while we were building makes this result stale
+        if generation == _generation:
+            for stale in [k for k in _cache if k[0] != today]:
+                del _cache[stale]
+            _cache[key] = result
+            while len(_cache) > MAX_CACHED:
+                _cache.popitem(last=False)
+    return result
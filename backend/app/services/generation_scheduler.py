@@ -0,0 +1,151 @@
+"""
+Generation Scheduler - Admission control in front of the LLM.
+
+At most AI_MAX_CONCURRENT_GENERATIONS chats stream from Ollama at once. Up to
+AI_MAX_QUEUED_GENERATIONS more wait in a queue. Past that, requests are
+rejected straight away with a Retry-After estimate instead of slowing every
+stream down.
+
+Waiters are grouped per key (section + session) and slots are handed out
+round-robin across keys. One session sending a burst of messages therefore
+cannot starve the others. All state lives on the event loop thread, so no
+locks are needed; each ticket carries its own events, so waiters only ever
+touch objects created in their own request.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Hashable
+
+MAX_CONCURRENT = int(os.getenv("AI_MAX_CONCURRENT_GENERATIONS", "2"))
+MAX_QUEUED = int(os.getenv("AI_MAX_QUEUED_GENERATIONS", "16"))
+DEFAULT_GENERATION_SECONDS = 10.0
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Generation queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Ticket:
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.granted = asyncio.Event()
+        self.changed = asyncio.Event()  # set whenever the queue moves
+        self.started_at = None
+        self.done = False
+
+
+class GenerationScheduler:
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT, max_queued: int = MAX_QUEUED):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.running = 0
+        self._queues = OrderedDict()  # key -> deque of waiting tickets, in round-robin order
+        self._avg_seconds = DEFAULT_GENERATION_SECONDS
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0, "cancelled": 0}
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def retry_after(self) -> int:
+        """Rough seconds until a new request would get a slot"""
+        rounds = (self.waiting + 1) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(rounds * self._avg_seconds))
+
+    def _notify(self):
+        for queue in self._queues.values():
+            for ticket in queue:
+                ticket.changed.set()
+
+    def _grant(self, ticket: Ticket):
+        self.running += 1
+        ticket.started_at = time.monotonic()
+        ticket.granted.set()
+        ticket.changed.set()
+        self.stats["admitted"] += 1
+
+    def _dispatch(self):
+        while self.running < self.max_concurrent and self._queues:
+            key, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            # Rotate: this key goes to the back of the line, or leaves if drained
+            del self._queues[key]
+            if queue:
+                self._queues[key] = queue
+            self._grant(ticket)
+        self._notify()
+
+    def submit(self, key: Hashable) -> Ticket:
+        """Admit or enqueue a request. Raises QueueFull when the queue is at capacity."""
+        ticket = Ticket(key)
+        if self.running < self.max_concurrent and not self._queues:
+            self._grant(ticket)
+            return ticket
+        if self.waiting >= self.max_queued:
+            self.stats["rejected"] += 1
+            raise QueueFull(self.retry_after())
+        self._queues.setdefault(key, deque()).append(ticket)
+        self.stats["queued"] += 1
+        self._notify()
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """1-based place in the round-robin order, 0 once admitted"""
+        if ticket.granted.is_set():
+            return 0
+        queues = [list(q) for q in self._queues.values()]
+        position = 0
+        for depth in range(max((len(q) for q in queues), default=0)):
+            for queue in queues:
+                if depth < len(queue):
+                    position += 1
+                    if queue[depth] is ticket:
+                        return position
+        return position
+
+    async def wait(self, ticket: Ticket) -> AsyncIterator[int]:
+        """Yield the ticket's queue position each time it changes, until admitted"""
+        last = None
+        while not ticket.granted.is_set():
+            position = self.position(ticket)
+            if position != last:
+                last = position
+                yield position
+            ticket.changed.clear()
+            await ticket.changed.wait()
+
+    def release(self, ticket: Ticket):
+        """Give back the slot, or leave the queue if never admitted. Safe to call twice."""
+        if ticket.done:
+            return
+        ticket.done = True
+        if ticket.granted.is_set():
+            self.running -= 1
+            elapsed = time.monotonic() - ticket.started_at
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+        else:
+            queue = self._queues.get(ticket.key)
+            if queue is not None and ticket in queue:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[ticket.key]
+            self.stats["cancelled"] += 1
+        self._dispatch()
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "avg_generation_seconds": round(self._avg_seconds, 3),
+            **self.stats,
+        }
+
+
+generation_scheduler = GenerationScheduler()
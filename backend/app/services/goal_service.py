@@ -0,0 +1,221 @@
+"""
+Goal Service - Keeps goal progress in step with the ledger.
+
+Transactions reach a goal through a GoalLink, either directly or via their
+category. Every linked transaction has exactly one GoalContribution row worth
+abs(amount), and manual changes to current_amount are stored as contributions
+without a transaction. `apply()` is called from ledger_events inside each
+write's DB transaction and adjusts contributions and current_amount by delta,
+so reading a goal never scans the ledger. `reconcile()` recomputes from
+scratch for existing data or after links change.
+"""
+import uuid
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.goal import Goal, GoalContribution, GoalLink
+from app.models.transaction import Transaction
+
+BATCH_SIZE = 5000
+
+
+def _field(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def contribution_amount(amount: float) -> float:
+    return abs(amount or 0.0)
+
+
+def _adjust(db: Session, deltas: dict):
+    """current_amount += delta for each goal, in one executemany"""
+    params = [{"goal_id": goal_id, "delta": delta} for goal_id, delta in deltas.items() if delta]
+    if not params:
+        return
+    table = Goal.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("goal_id"))
+        .values(current_amount=func.coalesce(table.c.current_amount, 0.0) + bindparam("delta")),
+        params,
+    )
+
+
+def resolve_goals(db: Session, rows: list) -> dict:
+    """Map transaction id -> goal id for the rows that are linked to a goal"""
+    ids = [_field(row, "id") for row in rows]
+    category_ids = {_field(row, "category_id") for row in rows} - {None}
+    direct = dict(db.query(GoalLink.transaction_id, GoalLink.goal_id).filter(GoalLink.transaction_id.in_(ids)))
+    by_category = {}
+    if category_ids:
+        by_category = dict(
+            db.query(GoalLink.category_id, GoalLink.goal_id).filter(GoalLink.category_id.in_(category_ids))
+        )
+    resolved = {}
+    for row in rows:
+        tx_id = _field(row, "id")
+        goal_id = direct.get(tx_id) or by_category.get(_field(row, "category_id"))
+        if goal_id is not None:
+            resolved[tx_id] = goal_id
+    return resolved
+
+
+def apply(db: Session, added: Iterable = (), removed: Iterable = ()):
+    """Move contributions for a change set; runs in the caller's transaction"""
+    added, removed = list(added), list(removed)
+    if not added and not removed:
+        return
+    # Derived contributions only exist while some link exists
+    if db.query(GoalLink.id).first() is None:
+        return
+
+    deltas = {}
+    removed_ids = [_field(row, "id") for row in removed]
+    if removed_ids:
+        for goal_id, amount in (
+            db.query(GoalContribution.goal_id, func.sum(GoalContribution.amount))
+            .filter(GoalContribution.transaction_id.in_(removed_ids))
+            .group_by(GoalContribution.goal_id)
+        ):
+            deltas[goal_id] = deltas.get(goal_id, 0.0) - amount
+        db.execute(delete(GoalContribution).where(GoalContribution.transaction_id.in_(removed_ids)))
+
+        # A deleted transaction takes its direct link with it; an update re-adds the same id
+        gone = set(removed_ids) - {_field(row, "id") for row in added}
+        if gone:
+            db.execute(delete(GoalLink).where(GoalLink.transaction_id.in_(gone)))
+
+    contributions = []
+    if added:
+        resolved = resolve_goals(db, added)
+        for row in added:
+            goal_id = resolved.get(_field(row, "id"))
+            if goal_id is None:
+                continue
+            amount = contribution_amount(_field(row, "amount"))
+            contributions.append({
+                "id": str(uuid.uuid4()),
+                "goal_id": goal_id,
+                "transaction_id": _field(row, "id"),
+                "amount": amount,
+                "date": _field(row, "date"),
+            })
+            deltas[goal_id] = deltas.get(goal_id, 0.0) + amount
+    if contributions:
+        db.execute(insert(GoalContribution), contributions)
+    _adjust(db, deltas)
+
+
+def record_manual(db: Session, goal: Goal, amount: float, note: str):
+    """Book a hand-entered change to current_amount as a contribution"""
+    if not amount:
+        return
+    db.add(GoalContribution(goal_id=goal.id, amount=amount, date=datetime.now(), note=note))
+
+
+def delete_goal_data(db: Session, goal_id: str):
+    db.execute(delete(GoalContribution).where(GoalContribution.goal_id == goal_id))
+    db.execute(delete(GoalLink).where(GoalLink.goal_id == goal_id))
+
+
+def reconcile(db: Session, goal_ids: Optional[list] = None) -> dict:
+    """Rebuild derived contributions and current_amount from links and the ledger.
+
+    Manual contributions are kept. A goal with an amount but no contribution
+    history yet (data from before goal linking) gets its amount booked as an
+    opening balance first. The caller commits.
+    """
+    goals_query = db.query(Goal.id, Goal.current_amount)
+    if goal_ids is not None:
+        goals_query = goals_query.filter(Goal.id.in_(goal_ids))
+    goals = goals_query.all()
+    scope = [g.id for g in goals]
+    if not scope:
+        return {"goals": 0, "contributions": 0}
+
+    with_history = {
+        goal_id for (goal_id,) in
+        db.query(GoalContribution.goal_id).filter(GoalContribution.goal_id.in_(scope)).distinct()
+    }
+    for goal in goals:
+        if goal.id not in with_history and goal.current_amount:
+            db.add(GoalContribution(goal_id=goal.id, amount=goal.current_amount, date=datetime.now(), note="Opening balance"))
+    db.flush()
+
+    db.execute(
+        delete(GoalContribution)
+        .where(GoalContribution.goal_id.in_(scope))
+        .where(GoalContribution.transaction_id.isnot(None))
+    )
+
+    direct_links = select(GoalLink.transaction_id).where(GoalLink.transaction_id.isnot(None))
+    direct = (
+        select(GoalLink.goal_id, Transaction.id, Transaction.amount, Transaction.date)
+        .join(Transaction, Transaction.id == GoalLink.transaction_id)
+        .where(GoalLink.goal_id.in_(scope))
+    )
+    via_category = (
+        select(GoalLink.goal_id, Transaction.id, Transaction.amount, Transaction.date)
+        .join(Transaction, Transaction.category_id == GoalLink.category_id)
+        .where(GoalLink.goal_id.in_(scope))
+        .where(Transaction.id.notin_(direct_links))
+    )
+
+    created = 0
+    for statement in (direct, via_category):
+        batch = []
+        for goal_id, tx_id, amount, date in db.execute(statement):
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "goal_id": goal_id,
+                "transaction_id": tx_id,
+                "amount": contribution_amount(amount),
+                "date": date,
+            })
+            if len(batch) >= BATCH_SIZE:
+                db.execute(insert(GoalContribution), batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            db.execute(insert(GoalContribution), batch)
+            created += len(batch)
+
+    totals = dict(
+        db.query(GoalContribution.goal_id, func.sum(GoalContribution.amount))
+        .filter(GoalContribution.goal_id.in_(scope))
+        .group_by(GoalContribution.goal_id)
+    )
+    db.execute(update(Goal), [{"id": goal_id, "current_amount": totals.get(goal_id, 0.0)} for goal_id in scope])
+    return {"goals": len(scope), "contributions": created}
+
+
+def link(db: Session, goal: Goal, transaction_id=None, category_id=None) -> GoalLink:
+    """Create a link and re-derive the goals whose contributions it moves. The caller commits."""
+    affected = {goal.id}
+    if transaction_id is not None:
+        # The transaction may currently count towards another goal via its category
+        affected.update(
+            goal_id for (goal_id,) in
+            db.query(GoalContribution.goal_id).filter(GoalContribution.transaction_id == transaction_id)
+        )
+    db_link = GoalLink(goal_id=goal.id, transaction_id=transaction_id, category_id=category_id)
+    db.add(db_link)
+    db.flush()
+    reconcile(db, list(affected))
+    return db_link
+
+
+def unlink(db: Session, db_link: GoalLink):
+    affected = {db_link.goal_id}
+    transaction_id = db_link.transaction_id
+    db.delete(db_link)
+    db.flush()
+    if transaction_id is not None:
+        # Falls back to whichever goal its category is linked to, if any
+        tx = db.query(Transaction.id, Transaction.category_id).filter(Transaction.id == transaction_id).first()
+        if tx is not None:
+            affected.update(resolve_goals(db, [tx]).values())
+    reconcile(db, list(affected))
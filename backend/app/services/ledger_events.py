@@ -0,0 +1,57 @@
+"""
+Ledger Events - The single place transaction writes fan out to derived state.
+
+Every write path reports the rows it added and removed (an update is the old
+row removed plus the new row added):
+
+- `apply()` runs inside the caller's DB transaction, before commit, and keeps
+  DB-side projections (monthly/category rollups, goal progress) in step.
+- `committed()` runs after a successful commit and patches in-memory
+  projections (the NumPy ledger snapshot, the categorizer index, cached
+  forecasts).
+- `reload()` is for large imports, where rebuilding the in-memory projections
+  once is cheaper than patching them row by row.
+
+Rows may be ORM objects or dicts; use `capture()` to copy an ORM object before
+it is mutated or expired.
+"""
+from typing import Iterable
+
+from sqlalchemy.orm import Session
+
+from app.services import forecast_service, goal_service, rollup_service
+from app.services.categorizer import categorizer
+from app.services.ledger_snapshot import ledger_snapshot
+
+FIELDS = ("id", "date", "amount", "category_id", "description", "notes")
+
+
+def capture(row) -> dict:
+    if isinstance(row, dict):
+        return {name: row.get(name) for name in FIELDS}
+    return {name: getattr(row, name) for name in FIELDS}
+
+
+def apply(db: Session, added: Iterable = (), removed: Iterable = ()):
+    """Update DB-side projections in the caller's transaction"""
+    added, removed = list(added), list(removed)
+    deltas = rollup_service.compute_deltas(removed, sign=-1)
+    deltas = rollup_service.compute_deltas(added, deltas=deltas)
+    rollup_service.apply_deltas(db, deltas)
+    goal_service.apply(db, added=added, removed=removed)
+
+
+def committed(added: Iterable = (), removed: Iterable = ()):
+    """Update in-memory projections once the write is durable"""
+    added, removed = list(added), list(removed)
+    removed_ids = [row["id"] if isinstance(row, dict) else row.id for row in removed]
+    ledger_snapshot.apply_changes(added, removed_ids)
+    categorizer.apply_changes(added, removed)
+    forecast_service.invalidate()
+
+
+def reload():
+    """Drop in-memory projections so they lazily rebuild from the DB"""
+    ledger_snapshot.invalidate()
+    categorizer.invalidate()
+    forecast_service.invalidate()
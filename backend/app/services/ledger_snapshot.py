@@ -0,0 +1,293 @@
+"""
+Ledger Snapshot - In-process columnar copy of the transactions table for analytics.
+
+Dates (int64 ns since epoch), amounts (float64), category codes (int32) and ids
+(16-byte UUIDs) are held as parallel NumPy arrays sorted by date. The snapshot
+is built in a worker thread at startup (or on first use, after an invalidate)
+and then patched incrementally by the transaction write routes, so group-bys,
+range sums and top-N queries are vectorized operations instead of ORM round
+trips. Rebuilds read the DB without holding the lock that writers take.
+"""
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import String, cast, select
+from sqlalchemy.orm import Session
+
+from app.models.transaction import Transaction
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_ns(value) -> int:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _MICROSECOND * 1000
+
+
+def _field(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def _uuid_bytes(value) -> bytes:
+    if not isinstance(value, uuid.UUID):
+        value = uuid.UUID(str(value))
+    return value.bytes
+
+
+class LedgerSnapshot:
+    def __init__(self):
+        self._lock = threading.RLock()  # guards the arrays; only held for in-memory work
+        self._rebuild_lock = threading.RLock()  # one DB reload at a time
+        self._generation = 0  # bumped by every rebuild and invalidate
+        self._pending = None  # changes reported while a rebuild is reading
+        self._categories = [None]  # code -> category_id, code 0 is "uncategorized"
+        self._codes = {None: 0}
+        self._reset()
+
+    def _reset(self):
+        self.loaded = False
+        self.dates = np.empty(0, dtype=np.int64)
+        self.amounts = np.empty(0, dtype=np.float64)
+        self.category_codes = np.empty(0, dtype=np.int32)
+        self.ids = np.empty(0, dtype="S16")
+        self.last_rebuild_at = None
+        self.last_rebuild_seconds = None
+
+    def _code(self, category_id) -> int:
+        if category_id is not None and not isinstance(category_id, uuid.UUID):
+            category_id = uuid.UUID(str(category_id))
+        code = self._codes.get(category_id)
+        if code is None:
+            code = len(self._categories)
+            self._codes[category_id] = code
+            self._categories.append(category_id)
+        return code
+
+    def _columns(self, rows: Iterable):
+        rows = list(rows)
+        dates = np.fromiter((_to_ns(_field(r, "date")) for r in rows), dtype=np.int64, count=len(rows))
+        amounts = np.fromiter((float(_field(r, "amount")) for r in rows), dtype=np.float64, count=len(rows))
+        codes = np.fromiter((self._code(_field(r, "category_id")) for r in rows), dtype=np.int32, count=len(rows))
+        ids = np.array([_uuid_bytes(_field(r, "id")) for r in rows], dtype="S16")
+        return dates, amounts, codes, ids
+
+    # --- Maintenance ---
+
+    def rebuild(self, db: Session):
+        """Reload every transaction from the DB.
+
+        The read runs without the lock, so writers reporting commits are never held up by it.
+        Changes reported meanwhile are logged and replayed by id once the new arrays are swapped
+        in, since the read may or may not have seen them. A rebuild overtaken by invalidate()
+        or a newer rebuild is discarded.
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                self._generation += 1
+                generation = self._generation
+                self._pending = []
+            started = time.perf_counter()
+            # Read UUIDs as text to skip per-row UUID object construction
+            stmt = select(
+                cast(Transaction.id, String),
+                Transaction.date,
+                Transaction.amount,
+                cast(Transaction.category_id, String),
+            ).order_by(Transaction.date, Transaction.id).execution_options(yield_per=10000)
+
+            local_code = {}  # category text -> index into `seen`
+            seen = []
+            dates, amounts, codes, ids = [], [], [], []
+            for tx_id, date, amount, category_id in db.execute(stmt):
+                code = local_code.get(category_id)
+                if code is None:
+                    code = local_code[category_id] = len(seen)
+                    seen.append(category_id)
+                ids.append(bytes.fromhex(tx_id.replace("-", "")))
+                dates.append(_to_ns(date))
+                amounts.append(amount)
+                codes.append(code)
+
+            with self._lock:
+                if generation != self._generation:
+                    return
+                to_global = np.array([self._code(c) for c in seen], dtype=np.int32)
+                self.dates = np.array(dates, dtype=np.int64)
+                self.amounts = np.array(amounts, dtype=np.float64)
+                self.category_codes = to_global[np.array(codes, dtype=np.intp)] if codes else np.empty(0, dtype=np.int32)
+                self.ids = np.array(ids, dtype="S16")
+                self.loaded = True
+                pending, self._pending = self._pending, None
+                for added, removed_ids in pending:
+                    self._remove(list(removed_ids) + [_field(r, "id") for r in added])
+                    self._add(added)
+                self.last_rebuild_at = datetime.utcnow()
+                self.last_rebuild_seconds = round(time.perf_counter() - started, 4)
+
+    def ensure_loaded(self, db: Session):
+        while not self.loaded:
+            with self._rebuild_lock:
+                if not self.loaded:
+                    self.rebuild(db)
+
+    def invalidate(self):
+        """Drop the snapshot; the next query reloads it (used after large imports)"""
+        with self._lock:
+            self._generation += 1
+            self._pending = None
+            self._reset()
+
+    def _add(self, rows: list):
+        dates, amounts, codes, ids = self._columns(rows)
+        if len(dates) == 0:
+            return
+        order = np.argsort(dates, kind="stable")
+        dates, amounts, codes, ids = dates[order], amounts[order], codes[order], ids[order]
+        positions = np.searchsorted(self.dates, dates, side="right")
+
+        self.dates = np.insert(self.dates, positions, dates)
+        self.amounts = np.insert(self.amounts, positions, amounts)
+        self.category_codes = np.insert(self.category_codes, positions, codes)
+        self.ids = np.insert(self.ids, positions, ids)
+
+    def _remove(self, transaction_ids: list):
+        targets = np.array([_uuid_bytes(t) for t in transaction_ids], dtype="S16")
+        if len(targets) == 0:
+            return
+        keep = ~np.isin(self.ids, targets)
+        self.dates = self.dates[keep]
+        self.amounts = self.amounts[keep]
+        self.category_codes = self.category_codes[keep]
+        self.ids = self.ids[keep]
+
+    def add(self, rows: Iterable):
+        """Insert committed transactions, keeping the arrays date-sorted"""
+        self.apply_changes(added=rows)
+
+    def remove(self, transaction_ids: Iterable):
+        """Drop transactions by id"""
+        self.apply_changes(removed_ids=transaction_ids)
+
+    def apply_changes(self, added: Iterable = (), removed_ids: Iterable = ()):
+        """Remove then insert as one step, so readers never see an update half-applied"""
+        added, removed_ids = list(added), list(removed_ids)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((added, removed_ids))
+            if not self.loaded:
+                return
+            self._remove(removed_ids)
+            self._add(added)
+
+    # --- Queries ---
+
+    def _window(self, start: Optional[datetime], end: Optional[datetime]):
+        with self._lock:
+            dates, amounts, codes, ids = self.dates, self.amounts, self.category_codes, self.ids
+            categories = list(self._categories)
+        lo = 0 if start is None else int(np.searchsorted(dates, _to_ns(start), side="left"))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, _to_ns(end), side="left"))
+        return dates[lo:hi], amounts[lo:hi], codes[lo:hi], ids[lo:hi], categories
+
+    def range_sum(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict:
+        _, amounts, _, _, _ = self._window(start, end)
+        return {
+            "total": float(amounts.sum()),
+            "income": float(amounts[amounts >= 0].sum()),
+            "expense": float(-amounts[amounts < 0].sum()),
+            "count": int(len(amounts)),
+        }
+
+    def daily_totals(self, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        """Net amount per calendar day with activity, as (datetime64[D] days, totals)"""
+        dates, amounts, _, _, _ = self._window(start, end)
+        days, slots = np.unique(dates.astype("datetime64[ns]").astype("datetime64[D]"), return_inverse=True)
+        return days, np.bincount(slots, weights=amounts, minlength=len(days))
+
+    def by_category(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+        _, amounts, codes, _, categories = self._window(start, end)
+        size = len(categories)
+        totals = np.bincount(codes, weights=amounts, minlength=size)
+        counts = np.bincount(codes, minlength=size)
+        expenses = np.bincount(codes, weights=np.where(amounts < 0, -amounts, 0.0), minlength=size)
+        return [
+            {
+                "category_id": categories[code],
+                "total": float(totals[code]),
+                "expense": float(expenses[code]),
+                "income": float(totals[code] + expenses[code]),
+                "count": int(counts[code]),
+            }
+            for code in np.nonzero(counts)[0]
+        ]
+
+    def by_month(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+        dates, amounts, _, _, _ = self._window(start, end)
+        if len(dates) == 0:
+            return []
+        months = dates.astype("datetime64[ns]").astype("datetime64[M]")
+        # Dates are sorted, so months are too and unique() keeps calendar order
+        keys, inverse = np.unique(months, return_inverse=True)
+        totals = np.bincount(inverse, weights=amounts)
+        counts = np.bincount(inverse)
+        expenses = np.bincount(inverse, weights=np.where(amounts < 0, -amounts, 0.0))
+        return [
+            {
+                "month": str(keys[i]),
+                "total": float(totals[i]),
+                "expense": float(expenses[i]),
+                "income": float(totals[i] + expenses[i]),
+                "count": int(counts[i]),
+            }
+            for i in range(len(keys))
+        ]
+
+    def top(self, n: int = 10, kind: str = "expense", start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+        dates, amounts, codes, ids, categories = self._window(start, end)
+        # Only rows of the requested kind; the largest expenses are the most negative amounts
+        candidates = np.flatnonzero(amounts < 0 if kind == "expense" else amounts > 0)
+        if len(candidates) == 0 or n <= 0:
+            return []
+        keyed = amounts[candidates] if kind == "expense" else -amounts[candidates]
+        n = min(n, len(keyed))
+        best = np.argpartition(keyed, n - 1)[:n]
+        picked = candidates[best[np.argsort(keyed[best], kind="stable")]]
+        return [
+            {
+                "id": uuid.UUID(bytes=ids[i]),
+                "date": np.datetime64(int(dates[i]), "ns").astype("datetime64[us]").item(),
+                "amount": float(amounts[i]),
+                "category_id": categories[codes[i]],
+            }
+            for i in picked
+        ]
+
+    def memory_stats(self) -> dict:
+        with self._lock:
+            arrays = {
+                "dates": self.dates.nbytes,
+                "amounts": self.amounts.nbytes,
+                "category_codes": self.category_codes.nbytes,
+                "ids": self.ids.nbytes,
+            }
+            return {
+                "loaded": self.loaded,
+                "rows": int(len(self.dates)),
+                "categories": len(self._categories) - 1,
+                "array_bytes": arrays,
+                "total_bytes": sum(arrays.values()),
+                "last_rebuild_at": self.last_rebuild_at,
+                "last_rebuild_seconds": self.last_rebuild_seconds,
+            }
+
+
+ledger_snapshot = LedgerSnapshot()
@@ -0,0 +1,95 @@
+"""
+Model Warm-up - Loads chat models into Ollama before users need them.
+
+On startup, and again every OLLAMA_WARMUP_INTERVAL seconds if one is set, each
+model is loaded with an empty generate call under the managed keep_alive. The
+chat model also gets the static system prompt prefix evaluated once, so the
+first real chat can reuse it from the KV cache. The models warmed are
+OLLAMA_MODEL plus the most recently modified finance-ai-* models (up to
+OLLAMA_WARM_CUSTOM_MODELS). Failures are logged and never block startup.
+Set OLLAMA_WARMUP=0 to turn this off.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+
+from app.services import context_builder
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("OLLAMA_WARMUP", "1") != "0"
+INTERVAL_SECONDS = float(os.getenv("OLLAMA_WARMUP_INTERVAL", "0"))
+CUSTOM_MODELS = int(os.getenv("OLLAMA_WARM_CUSTOM_MODELS", "1"))
+CUSTOM_PREFIX = "finance-ai-"
+
+status = {"last_run_at": None, "models": {}}
+
+
+def _model_name(entry) -> str:
+    return getattr(entry, "model", None) or (entry.get("name") if isinstance(entry, dict) else None) or ""
+
+
+def _modified(entry):
+    value = getattr(entry, "modified_at", None) or (entry.get("modified_at") if isinstance(entry, dict) else None)
+    return str(value or "")
+
+
+async def custom_models(client) -> list:
+    """Newest finance-ai-* models known to Ollama"""
+    if CUSTOM_MODELS <= 0:
+        return []
+    listing = await client.list()
+    entries = getattr(listing, "models", None)
+    if entries is None and isinstance(listing, dict):
+        entries = listing.get("models", [])
+    custom = [e for e in entries or [] if _model_name(e).startswith(CUSTOM_PREFIX)]
+    custom.sort(key=_modified, reverse=True)
+    return [_model_name(e) for e in custom[:CUSTOM_MODELS]]
+
+
+async def warm_model(client, model: str, keep_alive, prime_prefix: bool = False) -> dict:
+    result = {"warmed_at": datetime.now(), "load_seconds": None, "prefix_seconds": None, "error": None}
+    try:
+        started = time.perf_counter()
+        await client.generate(model=model, prompt="", keep_alive=keep_alive)
+        result["load_seconds"] = round(time.perf_counter() - started, 3)
+        if prime_prefix:
+            started = time.perf_counter()
+            await client.chat(
+                model=model,
+                messages=[{"role": "system", "content": context_builder.STATIC_PREFIX}, {"role": "user", "content": "hi"}],
+                options={"num_predict": 1},
+                keep_alive=keep_alive,
+            )
+            result["prefix_seconds"] = round(time.perf_counter() - started, 3)
+    except Exception as e:
+        result["error"] = str(e)
+        logger.warning("Warm-up of %s failed: %s", model, e)
+    status["models"][model] = result
+    return result
+
+
+async def warm_up(ai_service) -> dict:
+    client = ai_service.get_async_client()
+    await warm_model(client, ai_service.model, ai_service.keep_alive, prime_prefix=True)
+    try:
+        for model in await custom_models(client):
+            if model != ai_service.model:
+                await warm_model(client, model, ai_service.keep_alive)
+    except Exception as e:
+        logger.warning("Could not list custom models for warm-up: %s", e)
+    status["last_run_at"] = datetime.now()
+    if status["models"].get(ai_service.model, {}).get("error") is None:
+        ai_service.warmed_up = True
+    return status
+
+
+async def run_forever(ai_service):
+    """Startup task: warm once, then keep re-warming if an interval is configured"""
+    while True:
+        await warm_up(ai_service)
+        if INTERVAL_SECONDS <= 0:
+            return
+        await asyncio.sleep(INTERVAL_SECONDS)
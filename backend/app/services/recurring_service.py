@@ -0,0 +1,160 @@
+"""
+Recurring Service - Expands recurring expense rules into dated occurrences and
+materialises the missed ones as transactions.
+
+Occurrences are computed for all rules at once with NumPy date arithmetic.
+Month-based frequencies stay anchored to the rule's day of month and clamp to
+the last day of shorter months (31 Jan -> 28 Feb -> 31 Mar). The anchor is
+stored on the rule (anchor_day), because next_due_date may already be clamped;
+rules saved before the column existed fall back to next_due_date's day. Generated
+transactions get a deterministic id derived from (rule id, occurrence date), so
+re-running the processor, or moving a rule's due date back, never books the
+same period twice.
+"""
+import uuid
+from datetime import datetime, timedelta, date
+from typing import Optional, Tuple
+import numpy as np
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app.models.category import Category
+from app.models.recurring import RecurringExpense
+from app.models.transaction import Transaction
+from app.services import ledger_events
+
+MONTH_STEPS = {"Monthly": 1, "Quarterly": 3, "Yearly": 12}
+DAY_STEPS = {"Weekly": 7}
+FREQUENCIES = tuple(MONTH_STEPS) + tuple(DAY_STEPS)
+
+RECURRING_CATEGORY = "Recurring"
+OCCURRENCE_NAMESPACE = uuid.UUID("6f1c8e52-3d0b-4c47-9a55-2b8f4f0e7d31")
+BATCH_SIZE = 5000
+LOOKUP_CHUNK = 5000
+
+
+def _occurrence(days: np.ndarray, months: np.ndarray, day_of_month: np.ndarray,
+                step_months: np.ndarray, step_days: np.ndarray, k: np.ndarray) -> np.ndarray:
+    """Date of the k-th occurrence (k=0 is the due date itself), datetime64[D]"""
+    month = months + k * step_months
+    month_start = month.astype("datetime64[D]")
+    month_end = (month + 1).astype("datetime64[D]") - np.timedelta64(1, "D")
+    by_month = np.minimum(month_start + day_of_month, month_end)
+    by_day = days + k * step_days
+    return np.where(step_months > 0, by_month, by_day)
+
+
+def expand(due_dates, frequencies, until: date, anchor_days=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Expand rules into every occurrence from their due date up to `until` (inclusive).
+
+    `anchor_days` (1-31, or None per rule) is the day of month month-based rules
+    fall on; by default the due date's own day. Returns (rule_index,
+    occurrence_datetimes, next_due_per_rule) as NumPy arrays; occurrences keep
+    the time of day of the rule's due date.
+    """
+    due = np.array(due_dates, dtype="datetime64[s]")
+    days = due.astype("datetime64[D]")
+    time_of_day = due - days
+    months = days.astype("datetime64[M]")
+    day_of_month = (days - months.astype("datetime64[D]")).astype(np.int64)
+    if anchor_days is not None:
+        anchors = np.array([np.nan if a is None else a for a in anchor_days], dtype=np.float64)
+        day_of_month = np.where(np.isnan(anchors), day_of_month, anchors - 1).astype(np.int64)
+    day_of_month = day_of_month.astype("timedelta64[D]")
+    step_months = np.array([MONTH_STEPS.get(f, 0) for f in frequencies], dtype=np.int64)
+    step_days = np.array([DAY_STEPS.get(f, 0) for f in frequencies], dtype=np.int64)
+    limit = np.datetime64(until, "D")
+
+    # Candidate count from whole periods, then drop the last one if its
+    # clamped day still lands after `until`
+    month_span = (limit.astype("datetime64[M]") - months).astype(np.int64)
+    day_span = (limit - days).astype(np.int64)
+    last_k = np.where(
+        step_months > 0,
+        np.floor_divide(month_span, np.maximum(step_months, 1)),
+        np.floor_divide(day_span, np.maximum(step_days, 1)),
+    )
+    last_k = np.where((step_months > 0) | (step_days > 0), last_k, -1)
+    last_k = np.maximum(last_k, -1)
+    overshoot = _occurrence(days, months, day_of_month, step_months, step_days, np.maximum(last_k, 0)) > limit
+    counts = np.where(last_k >= 0, last_k + 1 - overshoot, 0)
+
+    rule_index = np.repeat(np.arange(len(due)), counts)
+    offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    occurrences = _occurrence(
+        days[rule_index], months[rule_index], day_of_month[rule_index],
+        step_months[rule_index], step_days[rule_index], offsets,
+    ) + time_of_day[rule_index]
+    next_due = _occurrence(days, months, day_of_month, step_months, step_days, counts) + time_of_day
+    return rule_index, occurrences, next_due
+
+
+def occurrence_id(rule_id: str, when: datetime) -> uuid.UUID:
+    return uuid.uuid5(OCCURRENCE_NAMESPACE, f"{rule_id}:{when.isoformat()}")
+
+
+def get_recurring_category(db: Session):
+    """Id of the category generated transactions are booked under, created on first use"""
+    category_id = db.query(Category.id).filter(Category.name == RECURRING_CATEGORY).scalar()
+    if category_id is None:
+        category = Category(name=RECURRING_CATEGORY, is_income=False)
+        db.add(category)
+        db.flush()
+        category_id = category.id
+    return category_id
+
+
+def process_due(db: Session, today: Optional[date] = None) -> dict:
+    """Book every missed occurrence of every active rule up to today and advance
+    the rules' next_due_date. The caller commits; the returned `added` rows are
+    for ledger_events.committed().
+    """
+    today = today or datetime.now().date()
+    cutoff = datetime.combine(today + timedelta(days=1), datetime.min.time())
+    rules = (
+        db.query(RecurringExpense.id, RecurringExpense.name, RecurringExpense.amount,
+                 RecurringExpense.frequency, RecurringExpense.next_due_date, RecurringExpense.anchor_day)
+        .filter(RecurringExpense.is_active.isnot(False))
+        .filter(RecurringExpense.next_due_date < cutoff)
+        .filter(RecurringExpense.frequency.in_(FREQUENCIES))
+        .all()
+    )
+    if not rules:
+        return {"rules": 0, "created": 0, "skipped": 0, "added": []}
+
+    # Rules saved before anchor_day existed keep the day of the due date they have now
+    anchors = [r.anchor_day or r.next_due_date.day for r in rules]
+    rule_index, occurrences, next_due = expand(
+        [r.next_due_date for r in rules], [r.frequency for r in rules], today, anchors
+    )
+
+    category_id = get_recurring_category(db)
+    rows = []
+    for i, when in zip(rule_index.tolist(), occurrences.astype(datetime).tolist()):
+        rule = rules[i]
+        rows.append({
+            "id": occurrence_id(rule.id, when),
+            "amount": -abs(rule.amount or 0.0),  # Expense is negative
+            "description": f"Recurring: {rule.name}",
+            "date": when,
+            "category_id": category_id,
+            "notes": "Auto-generated from recurring expense",
+        })
+
+    # Periods already booked by an earlier run are skipped, not duplicated
+    existing = set()
+    ids = [row["id"] for row in rows]
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        chunk = ids[start:start + LOOKUP_CHUNK]
+        existing.update(tx_id for (tx_id,) in db.query(Transaction.id).filter(Transaction.id.in_(chunk)))
+    new_rows = [row for row in rows if row["id"] not in existing]
+
+    for start in range(0, len(new_rows), BATCH_SIZE):
+        db.execute(insert(Transaction), new_rows[start:start + BATCH_SIZE])
+    ledger_events.apply(db, added=new_rows)
+
+    db.execute(update(RecurringExpense), [
+        {"id": rule.id, "next_due_date": due, "anchor_day": anchor}
+        for rule, due, anchor in zip(rules, next_due.astype(datetime).tolist(), anchors)
+    ])
+    return {"rules": len(rules), "created": len(new_rows), "skipped": len(existing), "added": new_rows}
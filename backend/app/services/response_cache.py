@@ -0,0 +1,95 @@
+"""
+Response Cache - Replays answers to repeated read-only questions without the LLM.
+
+Entries are keyed by the normalised prompt, section, AI context data version,
+model name and day, so any write to the financial tables (or a new day) makes
+old answers unreachable. Only complete answers without an action block are
+stored, since replaying an action would repeat a side effect. Eviction is LRU
+with a size cap (AI_RESPONSE_CACHE_SIZE) plus a TTL (AI_RESPONSE_CACHE_TTL
+seconds). Keys ignore chat history and the session summary, so the chat route
+only uses the cache for the first message of a session in the financial
+sections; a follow-up like "why?" never replays an unrelated answer.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+
+MAX_ENTRIES = int(os.getenv("AI_RESPONSE_CACHE_SIZE", "256"))
+TTL_SECONDS = float(os.getenv("AI_RESPONSE_CACHE_TTL", "600"))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION_RE = re.compile(r"[\s?!.]+$")
+_ACTION_RE = re.compile(r"```|\"action\"\s*:")
+
+
+def normalize(prompt: str) -> str:
+    prompt = _WHITESPACE_RE.sub(" ", prompt.strip().lower())
+    return _TRAILING_PUNCTUATION_RE.sub("", prompt)
+
+
+def is_cacheable(answer: str) -> bool:
+    return bool(answer.strip()) and not _ACTION_RE.search(answer)
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl_seconds: float = TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (stored_at, answer)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    def key(self, prompt: str, section: str, data_version: int, model: str, mode: str = "chat") -> tuple:
+        return (normalize(prompt), section.lower(), mode, data_version, model, date.today().isoformat())
+
+    def get(self, key: tuple) -> Optional[str]:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            stored_at, answer = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return answer
+
+    def put(self, key: tuple, answer: str) -> bool:
+        if self.max_entries <= 0 or not is_cacheable(answer):
+            return False
+        with self._lock:
+            self._entries[key] = (time.monotonic(), answer)
+            self._entries.move_to_end(key)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+                **self.stats,
+            }
+
+
+response_cache = ResponseCache()
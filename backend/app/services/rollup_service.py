@@ -0,0 +1,165 @@
+"""
+Rollup Service - Maintains per month x category aggregates of the ledger so the
+dashboard summary never has to scan the transactions table.
+"""
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import case, delete, func, update
+from sqlalchemy.orm import Session
+
+from app.models.transaction import Transaction
+from app.models.transaction_rollup import TransactionRollup
+
+
+def month_key(value) -> str:
+    """Return the YYYY-MM bucket for a datetime (or ISO date string)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return f"{value.year:04d}-{value.month:02d}"
+
+
+def _as_uuid(value) -> Optional[uuid.UUID]:
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(str(value))
+
+
+def _field(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def compute_deltas(rows: Iterable, sign: int = 1, deltas: Optional[dict] = None) -> dict:
+    """Aggregate transactions (ORM objects or dicts) into rollup deltas keyed by (month, category_id)"""
+    if deltas is None:
+        deltas = defaultdict(lambda: [0.0, 0, 0.0, 0.0])
+    for row in rows:
+        amount = float(_field(row, "amount"))
+        key = (month_key(_field(row, "date")), _as_uuid(_field(row, "category_id")))
+        delta = deltas[key]
+        delta[0] += sign * amount
+        delta[1] += sign
+        if amount >= 0:
+            delta[2] += sign * amount
+        else:
+            delta[3] += sign * -amount
+    return deltas
+
+
+def _upsert(db: Session, rows: list):
+    """INSERT ... ON CONFLICT (month, category_id) DO UPDATE SET col = col + excluded.col"""
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    table = TransactionRollup.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.month, table.c.category_id],
+        set_={name: table.c[name] + stmt.excluded[name] for name in ("total", "count", "income", "expense")},
+    )
+    db.execute(stmt, rows)
+
+
+def apply_deltas(db: Session, deltas: dict):
+    """Apply rollup deltas inside the caller's transaction (the caller commits).
+
+    Every change is a single atomic statement (col = col + delta), so concurrent
+    writers neither lose updates nor race each other to insert the same bucket.
+    """
+    table = TransactionRollup.__table__
+    upserts = []
+    for (month, category_id), (total, count, income, expense) in deltas.items():
+        values = {"total": total, "count": count, "income": income, "expense": expense}
+        if category_id is not None:
+            upserts.append({"id": uuid.uuid4(), "month": month, "category_id": category_id, **values})
+            continue
+        # NULLs never conflict on the unique constraint, so the uncategorized bucket is update-then-insert
+        updated = db.execute(
+            update(table)
+            .where(table.c.month == month, table.c.category_id.is_(None))
+            .values({name: table.c[name] + value for name, value in values.items()})
+        )
+        if updated.rowcount == 0:
+            upserts.append({"id": uuid.uuid4(), "month": month, "category_id": None, **values})
+    if upserts:
+        _upsert(db, upserts)
+    # Buckets whose last transaction went away
+    db.execute(delete(table).where(table.c.count <= 0))
+
+
+def record(db: Session, rows: Iterable, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) transactions from the rollups"""
+    apply_deltas(db, compute_deltas(rows, sign))
+
+
+def rebuild(db: Session) -> int:
+    """Recompute every rollup from the transactions table. Returns the number of rollup rows."""
+    if db.get_bind().dialect.name == "sqlite":
+        month = func.strftime("%Y-%m", Transaction.date)
+    else:
+        month = func.to_char(Transaction.date, "YYYY-MM")
+
+    rows = db.query(
+        month.label("month"),
+        Transaction.category_id,
+        func.sum(Transaction.amount),
+        func.count(Transaction.id),
+        func.coalesce(func.sum(case((Transaction.amount >= 0, Transaction.amount), else_=0.0)), 0.0),
+        func.coalesce(func.sum(case((Transaction.amount < 0, -Transaction.amount), else_=0.0)), 0.0),
+    ).group_by(month, Transaction.category_id).all()
+
+    db.query(TransactionRollup).delete(synchronize_session=False)
+    db.add_all([
+        TransactionRollup(
+            month=row[0],
+            category_id=row[1],
+            total=row[2] or 0.0,
+            count=row[3],
+            income=row[4],
+            expense=row[5],
+        )
+        for row in rows
+    ])
+    db.commit()
+    return len(rows)
+
+
+def get_summary(db: Session, month: Optional[str] = None) -> dict:
+    """Dashboard totals answered from the rollups (size is months x categories, not ledger rows)"""
+    rollups = db.query(TransactionRollup).all()
+
+    income = expenses = balance = 0.0
+    count = 0
+    by_category = defaultdict(lambda: {"total": 0.0, "count": 0, "income": 0.0, "expense": 0.0})
+    by_month = defaultdict(lambda: {"total": 0.0, "count": 0, "income": 0.0, "expense": 0.0})
+
+    for r in rollups:
+        balance += r.total
+        bucket = by_month[r.month]
+        bucket["total"] += r.total
+        bucket["count"] += r.count
+        bucket["income"] += r.income
+        bucket["expense"] += r.expense
+
+        if month is not None and r.month != month:
+            continue
+        income += r.income
+        expenses += r.expense
+        count += r.count
+        cat = by_category[r.category_id]
+        cat["total"] += r.total
+        cat["count"] += r.count
+        cat["income"] += r.income
+        cat["expense"] += r.expense
+
+    return {
+        "month": month,
+        "total_balance": balance,
+        "income": income,
+        "expenses": expenses,
+        "transaction_count": count,
+        "by_category": [{"category_id": k, **v} for k, v in by_category.items()],
+        "by_month": [{"month": k, **v} for k, v in sorted(by_month.items())],
+    }
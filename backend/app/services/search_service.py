@@ -0,0 +1,153 @@
+"""
+Search Service - Full-text search over transaction descriptions and notes.
+
+SQLite uses an FTS5 table kept in sync by triggers, so every write path (ORM,
+Core bulk inserts, raw SQL) updates the index in the same transaction.
+Transactions have UUID keys and only an implicit rowid, which VACUUM may
+renumber, so the FTS rows are keyed by an explicit INTEGER PRIMARY KEY in
+transaction_search_keys that maps to the transaction ID. Postgres uses a GIN
+index over a to_tsvector() expression, which the planner maintains
+automatically. Other databases fall back to LIKE.
+"""
+import re
+import uuid
+from typing import List, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.transaction import Transaction
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# The key column has no declared type, so IDs are copied exactly as the transactions table stores them
+_KEY = "(SELECT rowid FROM transaction_search_keys WHERE transaction_id = {row}.id)"
+
+SQLITE_SETUP = [
+    """
+    CREATE TABLE IF NOT EXISTS transaction_search_keys (
+        rowid INTEGER PRIMARY KEY, transaction_id UNIQUE NOT NULL
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        description, notes, tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN
+        INSERT INTO transaction_search_keys(transaction_id) VALUES (new.id);
+        INSERT INTO transactions_fts(rowid, description, notes)
+        VALUES ({_KEY.format(row="new")}, new.description, new.notes);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN
+        DELETE FROM transactions_fts WHERE rowid = {_KEY.format(row="old")};
+        DELETE FROM transaction_search_keys WHERE transaction_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE OF description, notes ON transactions BEGIN
+        UPDATE transactions_fts SET description = new.description, notes = new.notes
+        WHERE rowid = {_KEY.format(row="new")};
+    END
+    """,
+]
+
+SQLITE_BACKFILL = [
+    "INSERT INTO transaction_search_keys(transaction_id) SELECT id FROM transactions",
+    """
+    INSERT INTO transactions_fts(rowid, description, notes)
+    SELECT k.rowid, t.description, t.notes
+    FROM transaction_search_keys k JOIN transactions t ON t.id = k.transaction_id
+    """,
+]
+
+# The first version indexed transactions.rowid through an external-content table
+SQLITE_LEGACY_DROP = [
+    "DROP TRIGGER IF EXISTS transactions_fts_ai",
+    "DROP TRIGGER IF EXISTS transactions_fts_ad",
+    "DROP TRIGGER IF EXISTS transactions_fts_au",
+    "DROP TABLE IF EXISTS transactions_fts",
+]
+
+PG_DOCUMENT = "to_tsvector('simple', coalesce(description, '') || ' ' || coalesce(notes, ''))"
+
+PG_SETUP = [
+    f"CREATE INDEX IF NOT EXISTS ix_transactions_search ON transactions USING GIN ({PG_DOCUMENT})",
+]
+
+
+def ensure_search_index(engine: Engine):
+    """Create the full-text index (idempotent). Backfills SQLite FTS on first creation."""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transaction_search_keys'"
+            )).first()
+            if not exists:
+                for statement in SQLITE_LEGACY_DROP:
+                    conn.execute(text(statement))
+            for statement in SQLITE_SETUP:
+                conn.execute(text(statement))
+            if not exists:
+                for statement in SQLITE_BACKFILL:
+                    conn.execute(text(statement))
+        elif dialect == "postgresql":
+            for statement in PG_SETUP:
+                conn.execute(text(statement))
+
+
+def _tokens(query: str) -> List[str]:
+    return TOKEN_RE.findall(query.lower())
+
+
+def search(db: Session, query: str, limit: int = 20, offset: int = 0) -> List[Tuple[Transaction, float]]:
+    """Return (transaction, rank) pairs, best match first. Every term is prefix-matched."""
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        match = " ".join(f'"{t}"*' for t in tokens)
+        rows = db.execute(text(
+            """
+            SELECT k.transaction_id, -bm25(transactions_fts, 2.0, 1.0) AS rank
+            FROM transactions_fts
+            JOIN transaction_search_keys k ON k.rowid = transactions_fts.rowid
+            WHERE transactions_fts MATCH :match
+            ORDER BY bm25(transactions_fts, 2.0, 1.0)
+            LIMIT :limit OFFSET :offset
+            """
+        ), {"match": match, "limit": limit, "offset": offset}).all()
+    elif dialect == "postgresql":
+        match = " & ".join(f"{t}:*" for t in tokens)
+        rows = db.execute(text(
+            f"""
+            SELECT id, ts_rank({PG_DOCUMENT}, to_tsquery('simple', :match)) AS rank
+            FROM transactions
+            WHERE {PG_DOCUMENT} @@ to_tsquery('simple', :match)
+            ORDER BY rank DESC, date DESC
+            LIMIT :limit OFFSET :offset
+            """
+        ), {"match": match, "limit": limit, "offset": offset}).all()
+    else:
+        like = db.query(Transaction)
+        for t in tokens:
+            like = like.filter(Transaction.description.ilike(f"%{t}%") | Transaction.notes.ilike(f"%{t}%"))
+        found = like.order_by(Transaction.date.desc()).offset(offset).limit(limit).all()
+        return [(tx, 0.0) for tx in found]
+
+    ranks = {}
+    for tx_id, rank in rows:
+        if not isinstance(tx_id, uuid.UUID):
+            tx_id = uuid.UUID(str(tx_id))
+        ranks[tx_id] = float(rank)
+    if not ranks:
+        return []
+
+    by_id = {tx.id: tx for tx in db.query(Transaction).filter(Transaction.id.in_(list(ranks))).all()}
+    return [(by_id[tx_id], rank) for tx_id, rank in ranks.items() if tx_id in by_id]
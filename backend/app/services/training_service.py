@@ -5,6 +5,7 @@ import threading
 from typing import Generator, Optional
 from datetime import datetime
 from sqlalchemy.orm import Session
+from app.db.database import SessionLocal
 from app.models.training_job import TrainingJob, JobStatus
 from app.schemas.training import TrainingMetrics
 import ollama
@@ -87,8 +88,11 @@ PARAMETER top_k 40
         
         return modelfile_path
 
-    def train_model(self, job_id: str, db: Session):
+    def train_model(self, job_id: str):
         """Execute model training in background thread"""
+        # The thread outlives the request, so it owns a write session of its own
+        db = SessionLocal()
+        job = None
         try:
             # Get job from database
             job = db.query(TrainingJob).filter(TrainingJob.id == job_id).first()
@@ -160,20 +164,24 @@ PARAMETER top_k 40
                 del self.active_jobs[job_id]
                 
         except Exception as e:
-            job.status = JobStatus.FAILED
-            job.error_message = str(e)
-            job.updated_at = datetime.utcnow()
-            db.commit()
+            if job is not None:
+                db.rollback()
+                job.status = JobStatus.FAILED
+                job.error_message = str(e)
+                job.updated_at = datetime.utcnow()
+                db.commit()
             
             if job_id in self.active_jobs:
                 del self.active_jobs[job_id]
+        finally:
+            db.close()
 
-    def start_training(self, job_id: str, db: Session):
+    def start_training(self, job_id: str):
         """Start training in background thread"""
         if job_id in self.active_jobs:
             raise ValueError("Training already in progress for this job")
         
-        thread = threading.Thread(target=self.train_model, args=(job_id, db))
+        thread = threading.Thread(target=self.train_model, args=(job_id,))
         thread.daemon = True
         self.active_jobs[job_id] = thread
         thread.start()
@@ -212,6 +220,8 @@ PARAMETER top_k 40
                 yield "data: [DONE]\n\n"
                 break
             
+            # End the read transaction so the next poll sees fresh commits
+            db.rollback()
             time.sleep(1)  # Poll every second
 
     def get_available_models(self) -> list:
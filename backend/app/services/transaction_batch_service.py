@@ -0,0 +1,193 @@
+"""
+Transaction Batch Service - Applies many create/update/delete operations with
+bulk statements in a single DB transaction and reports a result per item.
+
+Items are checked up front (schema, nulls for required columns, duplicate and
+missing IDs, unknown categories). The rows and their ledger projections
+(rollups, goal progress) are written in one savepoint, so they commit or roll
+back together. If the database still rejects the bulk write, it is rolled
+back and the items are retried one by one, each in its own savepoint, so only
+the offending ones are reported.
+"""
+import uuid
+from typing import List, Tuple
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.schemas.transaction import TransactionCreate, TransactionUpdate, TransactionBatchOperation
+from app.services import ledger_events
+
+MAX_OPERATIONS = 1000
+# Columns an update may not set to null (TransactionUpdate makes every field optional)
+REQUIRED_FIELDS = ("amount", "description", "date", "category_id")
+
+
+def _error_text(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+def apply_batch(db: Session, operations: List[TransactionBatchOperation], atomic: bool = False) -> Tuple[list, list, list]:
+    """Validate and apply operations; the caller commits.
+
+    Returns (results, added_rows, removed_rows) so the caller can notify
+    ledger_events.committed() after the commit succeeds.
+    """
+    results = [
+        {"index": i, "op": op.op, "status": "ok", "id": op.id, "error": None}
+        for i, op in enumerate(operations)
+    ]
+
+    def fail(i, message):
+        results[i]["status"] = "error"
+        results[i]["error"] = message
+
+    creates, updates, deletes = [], [], []
+    touched = set()
+    for i, op in enumerate(operations):
+        if op.op != "create" and op.id is None:
+            fail(i, "id is required")
+            continue
+        if op.id is not None:
+            if op.id in touched:
+                fail(i, "Transaction appears more than once in this batch")
+                continue
+            touched.add(op.id)
+
+        try:
+            if op.op == "create":
+                values = TransactionCreate(**(op.data or {})).dict()
+                values["id"] = op.id or uuid.uuid4()
+                results[i]["id"] = values["id"]
+                creates.append((i, values))
+            elif op.op == "update":
+                changes = TransactionUpdate(**(op.data or {})).dict(exclude_unset=True)
+                if not changes:
+                    fail(i, "No fields to update")
+                    continue
+                nulls = [f for f in REQUIRED_FIELDS if f in changes and changes[f] is None]
+                if nulls:
+                    fail(i, "; ".join(f"{f}: may not be null" for f in nulls))
+                    continue
+                updates.append((i, changes))
+            else:
+                deletes.append(i)
+        except ValidationError as e:
+            fail(i, _error_text(e))
+
+    # One query for every referenced row and one for every referenced category
+    target_ids = [operations[i].id for i, _ in updates] + [operations[i].id for i in deletes]
+    create_ids = [v["id"] for _, v in creates]
+    existing = {}
+    if target_ids:
+        rows = db.query(*[getattr(Transaction, f) for f in ledger_events.FIELDS]).filter(Transaction.id.in_(target_ids))
+        existing = {row.id: ledger_events.capture(row) for row in rows}
+    taken = set()
+    if create_ids:
+        taken = {t for (t,) in db.query(Transaction.id).filter(Transaction.id.in_(create_ids))}
+
+    category_ids = {v["category_id"] for _, v in creates} | {c["category_id"] for _, c in updates if "category_id" in c}
+    known_categories = set()
+    if category_ids:
+        known_categories = {c for (c,) in db.query(Category.id).filter(Category.id.in_(category_ids))}
+
+    for i, values in creates:
+        if values["id"] in taken:
+            fail(i, "Transaction already exists")
+        elif values["category_id"] not in known_categories:
+            fail(i, "Category not found")
+    for i, changes in updates:
+        if operations[i].id not in existing:
+            fail(i, "Transaction not found")
+        elif "category_id" in changes and changes["category_id"] not in known_categories:
+            fail(i, "Category not found")
+    for i in deletes:
+        if operations[i].id not in existing:
+            fail(i, "Transaction not found")
+
+    ok = lambda i: results[i]["status"] == "ok"
+    if atomic and not all(ok(i) for i in range(len(operations))):
+        for r in results:
+            if r["status"] == "ok":
+                r["status"] = "skipped"
+        return results, [], []
+
+    creates = [(i, v) for i, v in creates if ok(i)]
+    updates = [(i, c) for i, c in updates if ok(i)]
+    deletes = [i for i in deletes if ok(i)]
+
+    # Rollups and goal progress are updated inside the same savepoint as the rows. On SQLite
+    # the savepoint can be the outermost one, whose RELEASE commits, so both land together.
+    try:
+        with db.begin_nested():
+            added, removed = _write(db, operations, existing, creates, updates, deletes)
+            ledger_events.apply(db, added=added, removed=removed)
+    except IntegrityError:
+        # Something the checks above can't see (e.g. a row created concurrently); find the items that caused it
+        added, removed = _write_each(db, operations, existing, creates, updates, deletes, atomic, fail)
+        if atomic and not all(ok(i) for i in range(len(operations))):
+            for r in results:
+                if r["status"] == "ok":
+                    r["status"] = "skipped"
+            return results, [], []
+
+    return results, added, removed
+
+
+def _write(db: Session, operations, existing, creates, updates, deletes) -> Tuple[list, list]:
+    """Bulk statements for the validated items; returns (added_rows, removed_rows)"""
+    added, removed = [], []
+    if creates:
+        rows = [v for _, v in creates]
+        db.execute(insert(Transaction), rows)
+        added.extend(ledger_events.capture(v) for v in rows)
+    if updates:
+        params = []
+        for i, changes in updates:
+            before = existing[operations[i].id]
+            params.append({"id": before["id"], **changes})
+            removed.append(before)
+            added.append({**before, **changes})
+        # ORM bulk UPDATE by primary key: one executemany per distinct set of changed columns
+        db.execute(update(Transaction), params)
+    if deletes:
+        ids = [operations[i].id for i in deletes]
+        db.execute(delete(Transaction).where(Transaction.id.in_(ids)).execution_options(synchronize_session=False))
+        removed.extend(existing[tx_id] for tx_id in ids)
+    return added, removed
+
+
+def _write_each(db: Session, operations, existing, creates, updates, deletes, atomic, fail) -> Tuple[list, list]:
+    """Write items one savepoint at a time, failing those the database rejects, then apply the
+    ledger deltas of the rest. With `atomic` the first rejection rolls everything back and stops.
+    """
+    added, removed = [], []
+    outer = db.begin_nested()
+    items = [("create", i, v) for i, v in creates] + [("update", i, c) for i, c in updates] + [("delete", i, None) for i in deletes]
+    for kind, i, values in items:
+        try:
+            with db.begin_nested():
+                item_added, item_removed = _write(
+                    db, operations, existing,
+                    [(i, values)] if kind == "create" else [],
+                    [(i, values)] if kind == "update" else [],
+                    [i] if kind == "delete" else [],
+                )
+        except IntegrityError as e:
+            fail(i, f"Rejected by the database: {e.orig}")
+            if atomic:
+                outer.rollback()
+                return [], []
+            continue
+        added.extend(item_added)
+        removed.extend(item_removed)
+    try:
+        ledger_events.apply(db, added=added, removed=removed)
+    except BaseException:
+        outer.rollback()
+        raise
+    outer.commit()
+    return added, removed
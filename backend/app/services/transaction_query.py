@@ -0,0 +1,84 @@
+"""
+Transaction Query - Shared filtering and keyset (cursor) pagination for ledger listings.
+"""
+import datetime
+import uuid
+from typing import Literal, Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import tuple_
+
+from app.models.transaction import Transaction
+from app.utils import cursor as cursor_codec
+
+
+class TransactionFilters:
+    """Query-string filters shared by the listing and export endpoints"""
+
+    def __init__(
+        self,
+        date_from: Optional[datetime.datetime] = None,
+        date_to: Optional[datetime.datetime] = None,
+        category_id: Optional[uuid.UUID] = None,
+        sign: Optional[Literal["income", "expense"]] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        description: Optional[str] = Query(None, description="Description prefix"),
+    ):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.category_id = category_id
+        self.sign = sign
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.description = description
+
+    def apply(self, query):
+        if self.date_from is not None:
+            query = query.filter(Transaction.date >= self.date_from)
+        if self.date_to is not None:
+            query = query.filter(Transaction.date < self.date_to)
+        if self.category_id is not None:
+            query = query.filter(Transaction.category_id == self.category_id)
+        if self.sign == "income":
+            query = query.filter(Transaction.amount >= 0)
+        elif self.sign == "expense":
+            query = query.filter(Transaction.amount < 0)
+        if self.min_amount is not None:
+            query = query.filter(Transaction.amount >= self.min_amount)
+        if self.max_amount is not None:
+            query = query.filter(Transaction.amount <= self.max_amount)
+        if self.description:
+            query = query.filter(Transaction.description.startswith(self.description, autoescape=True))
+        return query
+
+
+def encode_cursor(transaction) -> str:
+    return cursor_codec.encode_cursor(transaction.date, transaction.id)
+
+
+def decode_cursor(cursor: str):
+    date, tx_id = cursor_codec.decode_cursor(cursor)
+    try:
+        return date, uuid.UUID(tx_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def ordered(query, order: str = "desc"):
+    """Order by the (date, id) composite index"""
+    if order == "asc":
+        return query.order_by(Transaction.date.asc(), Transaction.id.asc())
+    return query.order_by(Transaction.date.desc(), Transaction.id.desc())
+
+
+def after_cursor(query, cursor: Optional[str], order: str = "desc"):
+    """Seek past the cursor row so every page costs the same as the first"""
+    if not cursor:
+        return query
+    date, tx_id = decode_cursor(cursor)
+    # A row-value comparison lets the planner seek the (date, id) index; the
+    # equivalent OR/AND form makes it walk the index from the top
+    key = tuple_(Transaction.date, Transaction.id)
+    if order == "asc":
+        return query.filter(key > (date, tx_id))
+    return query.filter(key < (date, tx_id))
@@ -0,0 +1,21 @@
+"""
+Opaque keyset-pagination cursors: a (timestamp, id) pair, base64-encoded JSON.
+"""
+import base64
+import datetime
+import json
+from fastapi import HTTPException
+
+
+def encode_cursor(timestamp: datetime.datetime, row_id) -> str:
+    payload = json.dumps({"d": timestamp.isoformat(), "id": str(row_id)})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """Return (timestamp, id string); a malformed cursor is a 400"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.datetime.fromisoformat(payload["d"]), str(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,22 @@
+"""
+Rebuild the monthly/category transaction rollups from the transactions table.
+Run once after upgrading an existing database, or any time the rollups drift.
+"""
+import sys
+sys.path.append('.')
+
+from app.db.database import Base, engine, SessionLocal
+from app.models.transaction import Transaction
+from app.models.category import Category
+from app.models.transaction_rollup import TransactionRollup
+from app.services import rollup_service
+
+if __name__ == "__main__":
+    print("Rebuilding transaction rollups...")
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        count = rollup_service.rebuild(db)
+    finally:
+        db.close()
+    print(f"✅ Rebuilt {count} rollup rows")
@@ -0,0 +1,23 @@
+"""
+Recompute goal contributions and current_amount from goal links and the ledger.
+Run once after upgrading an existing database, or any time goal progress drifts.
+"""
+import sys
+sys.path.append('.')
+
+from app.db.database import Base, engine, SessionLocal
+from app.models.transaction import Transaction
+from app.models.category import Category
+from app.models.goal import Goal, GoalLink, GoalContribution
+from app.services import goal_service
+
+if __name__ == "__main__":
+    print("Reconciling goals...")
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        result = goal_service.reconcile(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"✅ Reconciled {result['goals']} goals ({result['contributions']} linked transactions)")
@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+# The app reads its database at import time; tests get a throwaway SQLite file
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/test.db")
+
+import pytest
+
+from app.db.database import Base, SessionLocal, engine
+from app.models import category, chat, goal, recurring, training_job, transaction, transaction_rollup  # noqa: F401 (register tables)
+
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def food(db):
+    row = category.Category(name="Food", is_income=False)
+    db.add(row)
+    db.commit()
+    return row.id
@@ -0,0 +1,39 @@
+from app.services.action_executor import ActionBlockParser, parse_block
+
+REPLY = (
+    "Sure, I've added it.\n"
+    "```json\n{\"action\": \"add_transaction\", \"amount\": -250, \"description\": \"Uber\"}\n```\n"
+    "For example, code looks like this:\n```python\nprint('hi')\n```\n"
+    "```\n{\"note\": \"no action key\"}\n```\n"
+    "```JSON\n{\"action\": \"create_goal\", \"name\": \"Trip\", \"target_amount\": 50000}\n```\nDone."
+)
+
+
+def feed_in(chunks):
+    parser = ActionBlockParser()
+    return [[a["action"] for a in parser.feed(chunk)] for chunk in chunks]
+
+
+def test_actions_are_returned_when_their_closing_fence_arrives():
+    fed = feed_in([REPLY])
+
+    assert fed == [["add_transaction", "create_goal"]]
+
+
+def test_fences_split_across_chunks():
+    # One character at a time splits every fence and every JSON token
+    fed = feed_in(list(REPLY))
+
+    assert [a for step in fed for a in step] == ["add_transaction", "create_goal"]
+    closing = REPLY.index("```", REPLY.index("Uber")) + 2
+    assert fed[closing] == ["add_transaction"]
+
+
+def test_unterminated_block_yields_nothing():
+    assert feed_in(["```json\n{\"action\": \"add_transaction\"", ", \"amount\": 5}\n"]) == [[], []]
+
+
+def test_parse_block_ignores_non_actions():
+    assert parse_block("json\n[1, 2]") is None
+    assert parse_block("not json") is None
+    assert parse_block(" json {\"action\": \"create_goal\"} ") == {"action": "create_goal"}
@@ -0,0 +1,46 @@
+import threading
+from datetime import datetime
+
+from app.models.transaction import Transaction
+from app.services.categorizer import Categorizer
+
+
+def _insert(db, category_id, description):
+    tx = Transaction(amount=-10, description=description, date=datetime(2026, 1, 1), category_id=category_id)
+    db.add(tx)
+    db.commit()
+    return tx
+
+
+def test_learns_descriptions_from_the_ledger(db, food):
+    for description in ("Swiggy order", "Swiggy dinner", "Zomato lunch"):
+        _insert(db, food, description)
+    categorizer = Categorizer()
+
+    assert categorizer.ensure_loaded(db)
+    assert categorizer.best("swiggy") == str(food)
+    assert categorizer.best("petrol pump") is None
+
+
+def test_rebuild_does_not_block_writers_and_discards_overtaken_results(db, food):
+    _insert(db, food, "Swiggy order")
+    categorizer = Categorizer()
+    execute = db.execute
+    calls = []
+
+    def hooked(*args, **kwargs):
+        result = execute(*args, **kwargs)
+        if not calls:  # only during the first attempt
+            calls.append(1)
+            worker = threading.Thread(target=categorizer.apply_changes, kwargs={"added": [{"description": "x", "category_id": food}]})
+            worker.start()
+            worker.join(timeout=2)
+            assert not worker.is_alive(), "writer blocked behind the rebuild"
+        return result
+
+    db.execute = hooked
+    assert categorizer.rebuild(db) is False
+    assert not categorizer.loaded
+
+    assert categorizer.ensure_loaded(db)
+    assert categorizer.learned == 1
@@ -0,0 +1,21 @@
+import io
+
+from app.models.transaction import Transaction
+from app.services import csv_import_service
+
+
+def test_non_finite_amounts_are_rejected_per_row(db, food):
+    stream = io.StringIO(
+        "Date,Amount,Description,Category\n"
+        "2026-01-01,120,Lunch,Food\n"
+        "2026-01-02,nan,Snack,Food\n"
+        "2026-01-03,-inf,Dinner,Food\n"
+        "2026-01-04,\"1,250.50\",Groceries,food\n"
+    )
+
+    result = csv_import_service.import_transactions(db, stream)
+
+    assert (result["accepted"], result["rejected"]) == (2, 2)
+    assert [e["row"] for e in result["errors"]] == [3, 4]
+    assert "not a number" in result["errors"][0]["error"]
+    assert sorted(a for (a,) in db.query(Transaction.amount)) == [120, 1250.5]
@@ -0,0 +1,59 @@
+import pytest
+
+from app.services import fast_path
+
+CATEGORIES = [
+    {"id": "1", "name": "Food & Dining", "is_income": False},
+    {"id": "2", "name": "Groceries", "is_income": False},
+    {"id": "3", "name": "Transport", "is_income": False},
+    {"id": "4", "name": "Salary", "is_income": True},
+]
+
+
+@pytest.mark.parametrize("message, amount, category", [
+    ("add food 100", -100, "Food & Dining"),
+    ("spent 500 on groceries", -500, "Groceries"),
+    ("chai ₹50", -50, "Food & Dining"),
+    ("expense chai 50", -50, "Food & Dining"),
+    ("uber 250 rs", -250, "Transport"),
+    ("Add 2k uber", -2000, "Transport"),
+    ("paid ₹1,200 for petrol", -1200, "Transport"),
+    ("received 50000 as salary", 50000, "Salary"),
+    ("add expense 100 for lunch.", -100, "Food & Dining"),
+])
+def test_recognizes_simple_commands(message, amount, category):
+    action = fast_path.recognize(message, CATEGORIES)
+    assert action is not None
+    assert action["data"]["amount"] == amount
+    assert action["category"] == category
+
+
+@pytest.mark.parametrize("message", [
+    "food in 2024",
+    "food over 500",
+    "groceries last 30",
+    "salary since 2023",
+    "food above 1000",
+    "transport under 200",
+    "food this month 500",
+    "spent on food last 30",
+])
+def test_qualified_numbers_are_not_amounts(message):
+    assert fast_path.parse(message) is None
+    assert fast_path.recognize(message, CATEGORIES) is None
+
+
+@pytest.mark.parametrize("message", ["bus 42", "rent 2", "chai 50", "food 2k"])
+def test_bare_word_and_number_needs_a_verb_or_currency(message):
+    assert fast_path.parse(message) is None
+
+
+@pytest.mark.parametrize("message", [
+    "how much did I spend on food?",
+    "show food 100",
+    "add food",
+    "add gadget 300",
+    "spent 100 on salary",
+])
+def test_questions_and_unclear_commands_fall_through(message):
+    assert fast_path.recognize(message, CATEGORIES) is None
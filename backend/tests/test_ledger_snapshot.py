@@ -0,0 +1,90 @@
+import threading
+import uuid
+from datetime import datetime
+
+from app.models.transaction import Transaction
+from app.services.ledger_snapshot import LedgerSnapshot
+
+FOOD = uuid.uuid4()
+SALARY = uuid.uuid4()
+
+
+def row(amount, day, category_id=FOOD):
+    return {"id": uuid.uuid4(), "date": datetime(2026, 1, day), "amount": amount, "category_id": category_id}
+
+
+def snapshot(rows):
+    snap = LedgerSnapshot()
+    snap.loaded = True
+    snap.add(rows)
+    return snap
+
+
+def test_top_only_ranks_the_requested_kind():
+    snap = snapshot([row(-50, 1), row(1000, 2, SALARY), row(-300, 3), row(20, 4, SALARY), row(-10, 5)])
+
+    assert [t["amount"] for t in snap.top(2, "expense")] == [-300, -50]
+    assert [t["amount"] for t in snap.top(5, "income")] == [1000, 20]
+
+
+def test_top_with_fewer_rows_of_a_kind_than_requested():
+    snap = snapshot([row(-50, 1), row(1000, 2, SALARY), row(500, 3, SALARY)])
+
+    assert [t["amount"] for t in snap.top(10, "expense")] == [-50]
+    assert snap.top(10, "income")[0]["category_id"] == SALARY
+    assert snapshot([row(100, 1)]).top(3, "expense") == []
+
+
+def _insert(db, category_id, amount, day):
+    tx = Transaction(amount=amount, description="t", date=datetime(2026, 1, day), category_id=category_id)
+    db.add(tx)
+    db.commit()
+    return tx
+
+
+def _during_read(db, callback):
+    """Run `callback` in another thread while rebuild() is reading from `db`"""
+    execute = db.execute
+
+    def hooked(*args, **kwargs):
+        result = execute(*args, **kwargs)
+        worker = threading.Thread(target=callback)
+        worker.start()
+        worker.join(timeout=2)
+        assert not worker.is_alive(), "writer blocked behind the rebuild"
+        return result
+
+    db.execute = hooked
+
+
+def test_rebuild_reads_the_ledger(db, food):
+    _insert(db, food, -40, 2)
+    _insert(db, food, 100, 1)
+    snap = LedgerSnapshot()
+    snap.ensure_loaded(db)
+
+    assert snap.range_sum() == {"total": 60.0, "income": 100.0, "expense": 40.0, "count": 2}
+    assert snap.range_sum(datetime(2026, 1, 2)) == {"total": -40.0, "income": 0.0, "expense": 40.0, "count": 1}
+
+
+def test_change_reported_during_rebuild_is_counted_once(db, food):
+    snap = LedgerSnapshot()
+    snap.ensure_loaded(db)
+    tx = _insert(db, food, -25, 3)  # committed; its committed() arrives while the next rebuild reads
+    row = {"id": tx.id, "date": tx.date, "amount": tx.amount, "category_id": tx.category_id}
+
+    _during_read(db, lambda: snap.apply_changes(added=[row]))
+    snap.rebuild(db)
+
+    assert snap.range_sum()["count"] == 1
+    assert snap.range_sum()["total"] == -25.0
+
+
+def test_rebuild_overtaken_by_invalidate_is_discarded(db, food):
+    _insert(db, food, -25, 3)
+    snap = LedgerSnapshot()
+
+    _during_read(db, snap.invalidate)
+    snap.rebuild(db)
+
+    assert not snap.loaded
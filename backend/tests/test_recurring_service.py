@@ -0,0 +1,51 @@
+from datetime import date, datetime
+
+from app.models.recurring import RecurringExpense
+from app.models.transaction import Transaction
+from app.services import recurring_service
+
+
+def dates(occurrences):
+    return [str(d)[:10] for d in occurrences.astype("datetime64[D]")]
+
+
+def test_month_end_anchor_survives_short_months():
+    _, occurrences, next_due = recurring_service.expand([datetime(2025, 1, 31)], ["Monthly"], date(2025, 4, 30))
+
+    assert dates(occurrences) == ["2025-01-31", "2025-02-28", "2025-03-31", "2025-04-30"]
+    assert dates(next_due) == ["2025-05-31"]
+
+
+def test_clamped_due_date_keeps_its_anchor():
+    # A rule anchored on the 31st whose stored due date was clamped to Feb 28
+    _, occurrences, next_due = recurring_service.expand([datetime(2025, 2, 28)], ["Monthly"], date(2025, 4, 30), [31])
+
+    assert dates(occurrences) == ["2025-02-28", "2025-03-31", "2025-04-30"]
+    assert dates(next_due) == ["2025-05-31"]
+
+
+def test_weekly_and_quarterly_rules_expand_together():
+    rule_index, occurrences, next_due = recurring_service.expand(
+        [datetime(2025, 1, 1, 9, 30), datetime(2024, 11, 30)], ["Weekly", "Quarterly"], date(2025, 1, 20)
+    )
+
+    assert rule_index.tolist() == [0, 0, 0, 1]
+    assert dates(occurrences) == ["2025-01-01", "2025-01-08", "2025-01-15", "2024-11-30"]
+    assert str(occurrences[0]) == "2025-01-01T09:30:00"
+    assert dates(next_due) == ["2025-01-22", "2025-02-28"]
+
+
+def test_processing_twice_keeps_the_month_end_anchor(db):
+    db.add(RecurringExpense(id="rent", name="Rent", amount=1000, frequency="Monthly",
+                            next_due_date=datetime(2025, 1, 31), anchor_day=31))
+    db.commit()
+
+    first = recurring_service.process_due(db, today=date(2025, 2, 28))
+    second = recurring_service.process_due(db, today=date(2025, 4, 30))
+    again = recurring_service.process_due(db, today=date(2025, 4, 30))
+    db.commit()
+
+    booked = sorted(str(d)[:10] for (d,) in db.query(Transaction.date))
+    assert booked == ["2025-01-31", "2025-02-28", "2025-03-31", "2025-04-30"]
+    assert (first["created"], second["created"], again["rules"]) == (2, 2, 0)
+    assert db.get(RecurringExpense, "rent").next_due_date == datetime(2025, 5, 31)
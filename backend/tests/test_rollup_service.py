@@ -0,0 +1,61 @@
+import uuid
+from datetime import datetime
+
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.transaction_rollup import TransactionRollup
+from app.services import rollup_service
+
+
+def snapshot(db):
+    return {
+        (r.month, r.category_id): (round(r.total, 2), r.count, round(r.income, 2), round(r.expense, 2))
+        for r in db.query(TransactionRollup)
+    }
+
+
+def test_compute_deltas_splits_income_and_expense():
+    food = uuid.uuid4()
+    rows = [
+        {"date": datetime(2026, 1, 5), "amount": -40.0, "category_id": food},
+        {"date": datetime(2026, 1, 20), "amount": 15.0, "category_id": str(food)},
+        {"date": "2026-02-01T10:00:00", "amount": -5.0, "category_id": None},
+    ]
+
+    deltas = rollup_service.compute_deltas(rows)
+    rollup_service.compute_deltas(rows[:1], sign=-1, deltas=deltas)
+
+    assert dict(deltas) == {
+        ("2026-01", food): [15.0, 1, 15.0, 0.0],
+        ("2026-02", None): [-5.0, 1, 0.0, 5.0],
+    }
+
+
+def test_incremental_deltas_match_a_rebuild(db, food):
+    travel = Category(name="Travel", is_income=False)
+    db.add(travel)
+    db.flush()
+    rows = [
+        Transaction(id=uuid.uuid4(), date=datetime(2026, 1, d), amount=a, description="x", category_id=c)
+        for d, a, c in [(1, -100.0, food), (2, 2500.0, food), (3, -30.0, travel.id), (31, -7.5, travel.id)]
+    ]
+    moved = Transaction(id=uuid.uuid4(), date=datetime(2026, 2, 1), amount=-60.0, description="x", category_id=food)
+    db.add_all(rows + [moved])
+    db.flush()
+    rollup_service.record(db, rows + [moved])
+    # Remove one row entirely and drain the February bucket so it is deleted
+    db.delete(rows[0])
+    db.delete(moved)
+    rollup_service.record(db, [rows[0], moved], sign=-1)
+    db.commit()
+    incremental = snapshot(db)
+
+    rollup_service.rebuild(db)
+
+    assert incremental == snapshot(db)
+    assert incremental == {
+        ("2026-01", food): (2500.0, 1, 2500.0, 0.0),
+        ("2026-01", travel.id): (-37.5, 2, 0.0, 37.5),
+    }
+    summary = rollup_service.get_summary(db, month="2026-01")
+    assert (summary["income"], summary["expenses"], summary["transaction_count"]) == (2500.0, 37.5, 3)
@@ -0,0 +1,71 @@
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.db.database import SessionLocal
+from app.models.transaction import Transaction
+from app.schemas.transaction import TransactionBatchOperation
+from app.services import rollup_service, transaction_batch_service
+
+
+def create(food, amount=-10, description="lunch", **extra):
+    data = {"amount": amount, "description": description, "date": "2026-01-05T00:00:00", "category_id": str(food)}
+    return TransactionBatchOperation(op="create", data=data, **extra)
+
+
+def statuses(results):
+    return [(r["status"], r["error"]) for r in results]
+
+
+def test_invalid_items_fail_alone(db, food):
+    existing = Transaction(amount=-1, description="old", date=datetime(2026, 1, 1), category_id=food)
+    taken = Transaction(amount=-2, description="taken", date=datetime(2026, 1, 1), category_id=food)
+    db.add_all([existing, taken])
+    db.commit()
+
+    results, added, removed = transaction_batch_service.apply_batch(db, [
+        create(food),
+        TransactionBatchOperation(op="update", id=existing.id, data={"amount": None}),
+        create(food, id=taken.id),
+        TransactionBatchOperation(op="delete", id=uuid.uuid4()),
+        create(uuid.uuid4()),
+        TransactionBatchOperation(op="update", id=existing.id, data={"description": "renamed"}),
+    ])
+    db.commit()
+
+    assert statuses(results) == [
+        ("ok", None),
+        ("error", "amount: may not be null"),
+        ("error", "Transaction already exists"),
+        ("error", "Transaction not found"),
+        ("error", "Category not found"),
+        ("error", "Transaction appears more than once in this batch"),
+    ]
+    assert len(added) == 1 and removed == []
+    # The fixture rows were inserted directly, so the rollups only hold the batch's create
+    assert rollup_service.get_summary(db)["transaction_count"] == 1
+
+
+def test_atomic_batch_skips_everything_on_one_failure(db, food):
+    results, added, removed = transaction_batch_service.apply_batch(
+        db, [create(food), TransactionBatchOperation(op="delete", id=uuid.uuid4())], atomic=True
+    )
+    db.commit()
+
+    assert [r["status"] for r in results] == ["skipped", "error"]
+    assert (added, removed) == ([], [])
+    assert db.query(Transaction).count() == 0
+
+
+def test_rows_and_rollups_commit_together(db, food, monkeypatch):
+    def broken(db, deltas):
+        raise RuntimeError("rollup write failed")
+
+    monkeypatch.setattr(rollup_service, "apply_deltas", broken)
+    with pytest.raises(RuntimeError):
+        transaction_batch_service.apply_batch(db, [create(food)])
+    db.rollback()
+
+    with SessionLocal() as other:
+        assert other.query(Transaction).count() == 0
@@ -0,0 +1,63 @@
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.models.transaction import Transaction
+from app.services.transaction_query import TransactionFilters, after_cursor, encode_cursor, ordered
+
+
+@pytest.fixture
+def ledger(db, food):
+    # Several rows share a timestamp, so only the id tie-break keeps pages apart.
+    # Fixed hex ids with letters in them keep SQLite from storing any as a number.
+    rows = [
+        Transaction(
+            id=uuid.UUID(f"{i:02x}" + "a" * 30),
+            date=datetime(2026, 1, 1 + i // 4),
+            amount=-10.0 * (i + 1) if i % 3 else 100.0,
+            description=f"row {i}",
+            category_id=food,
+        )
+        for i in range(11)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def pages(db, order, limit, filters=None):
+    seen, cursor = [], None
+    while True:
+        query = select(Transaction)
+        if filters is not None:
+            query = filters.apply(query)
+        page = db.scalars(ordered(after_cursor(query, cursor, order), order).limit(limit)).all()
+        if not page:
+            return seen
+        seen.append([t.description for t in page])
+        cursor = encode_cursor(page[-1])
+
+
+@pytest.mark.parametrize("order", ["desc", "asc"])
+def test_pages_cover_every_row_once_across_ties(db, ledger, order):
+    expected = sorted(ledger, key=lambda t: (t.date, t.id.hex), reverse=order == "desc")
+
+    result = pages(db, order, limit=3)
+
+    assert [len(p) for p in result] == [3, 3, 3, 2]
+    assert sum(result, []) == [t.description for t in expected]
+
+
+def test_cursor_respects_filters(db, ledger):
+    result = pages(db, "desc", limit=2, filters=TransactionFilters(sign="expense", min_amount=-60.0, description=None))
+
+    assert sum(result, []) == ["row 5", "row 4", "row 2", "row 1"]
+
+
+def test_malformed_cursor_is_a_400(db):
+    with pytest.raises(HTTPException) as exc:
+        after_cursor(select(Transaction), "not-a-cursor")
+    assert exc.value.status_code == 400
@@ -86,6 +86,9 @@ const SimpleChatInterface = () => {
                                     <p className="whitespace-pre-wrap leading-relaxed text-sm">
                                         {msg.content.replace(/```json[\s\S]*?```/g, '').trim()}
                                     </p>
+                                    {msg.cached && (
+                                        <span className="mt-1 block text-[11px] text-emerald-400/70">⚡ Instant answer</span>
+                                    )}
                                 </div>
 
                                 {msg.role === 'user' && (
@@ -111,8 +111,17 @@ export const deleteRecurringExpense = async (recurringId) => {
 // Chat Sessions
 export const getChatSessions = async (section = 'rag') => {
     try {
-        const response = await api.get(`/ai/sessions?section=${section}`);
-        return response.data;
+        // Summary listing: titles, counts and previews only, no message bodies.
+        // Follow the cursor so sessions past the first page are not dropped.
+        const sessions = [];
+        let cursor = null;
+        do {
+            const params = { section, limit: 200, ...(cursor ? { cursor } : {}) };
+            const response = await api.get('/ai/sessions/summary', { params });
+            sessions.push(...response.data.items);
+            cursor = response.data.next_cursor;
+        } while (cursor);
+        return sessions;
     } catch (error) {
         console.error("Error fetching chat sessions:", error);
         return [];
@@ -1,13 +1,10 @@
 import { create } from 'zustand';
 import {
-    createGoal,
-    createTransaction,
     getChatSessions,
     createChatSession,
     updateChatSession,
     deleteChatSession,
-    getChatMessages,
-    getCategories
+    getChatMessages
 } from '../services/api';
 
 // Define API_URL for direct fetch calls (not using axios instance)
@@ -142,6 +139,11 @@ export const useChatStore = create((set, get) => ({
 
             const response = await Promise.race([fetchPromise, timeoutPromise]);
 
+            if (response.status === 429) {
+                const retryAfter = response.headers.get('Retry-After');
+                throw new Error(`The assistant is busy. Please try again in ${retryAfter || 'a few'} seconds.`);
+            }
+
             if (!response.ok) {
                 const errorText = await response.text();
                 console.error('API Error Response:', errorText);
@@ -151,6 +153,7 @@ export const useChatStore = create((set, get) => ({
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
             let assistantMessage = '';
+            const actionResults = [];
 
             while (true) {
                 const { done, value } = await reader.read();
@@ -186,6 +189,25 @@ export const useChatStore = create((set, get) => ({
                                 break;
                             }
 
+                            // An action block was executed server-side
+                            if (parsed.action_result) {
+                                actionResults.push(parsed.action_result);
+                                continue;
+                            }
+
+                            // Waiting for a free generation slot
+                            if (parsed.queue_position !== undefined && !assistantMessage) {
+                                set((state) => {
+                                    const newMessages = [...state.messages];
+                                    newMessages[newMessages.length - 1] = {
+                                        role: 'assistant',
+                                        content: `⏳ Waiting in queue (position ${parsed.queue_position})...`,
+                                        created_at: new Date().toISOString()
+                                    };
+                                    return { messages: newMessages };
+                                });
+                            }
+
                             if (parsed.content) {
                                 assistantMessage += parsed.content;
 
@@ -195,6 +217,8 @@ export const useChatStore = create((set, get) => ({
                                     newMessages[newMessages.length - 1] = {
                                         role: 'assistant',
                                         content: assistantMessage,
+                                        // Replayed from the server's response cache
+                                        cached: Boolean(parsed.cached),
                                         created_at: new Date().toISOString()
                                     };
                                     return { messages: newMessages };
@@ -207,54 +231,12 @@ export const useChatStore = create((set, get) => ({
                 }
             }
 
-            // Check for actions after stream is complete
-            // Improved Regex to handle variations (make 'json' optional)
-            const actionMatch = assistantMessage.match(/```(?:json)?\s*([\s\S]*?)\s*```/);
-            if (actionMatch) {
-                try {
-                    const actionData = JSON.parse(actionMatch[1]);
-                    console.log("Executing Action:", actionData);
-
-                    if (actionData.action === 'create_goal') {
-                        await createGoal(actionData.data);
-                        addMessage({ role: 'assistant', content: '✅ Goal created successfully!', created_at: new Date().toISOString() });
-                    } else if (actionData.action === 'add_transaction') {
-                        let categoryId = actionData.data.category_id;
-
-                        // Identify if we need to fetch a real category ID
-                        const isInvalidId = !categoryId || categoryId === "USE_ACTUAL_UUID_FROM_CATEGORIES";
-
-                        if (isInvalidId) {
-                            try {
-                                const categories = await getCategories();
-                                if (categories && categories.length > 0) {
-                                    // Try to match by description if possible
-                                    const desc = (actionData.data.description || '').toLowerCase();
-                                    // Or prompt text if available? No, we don't have prompt here.
-                                    // Best effort: find category match
-                                    const match = categories.find(c => desc.includes(c.name.toLowerCase()));
-                                    categoryId = match ? match.id : categories[0].id; // Fallback to first category
-                                }
-                            } catch (err) {
-                                console.error("Failed to fetch categories for default", err);
-                            }
-                        }
-
-                        if (!categoryId) {
-                            throw new Error("No category available for transaction.");
-                        }
-
-                        await createTransaction({
-                            ...actionData.data,
-                            date: new Date().toISOString(),
-                            category_id: categoryId
-                        });
-                        addMessage({ role: 'assistant', content: '✅ Transaction added successfully!', created_at: new Date().toISOString() });
-                    }
-                } catch (e) {
-                    console.error("Failed to execute action", e);
-                    addMessage({ role: 'assistant', content: '❌ Failed to execute the requested action: ' + e.message, created_at: new Date().toISOString() });
-                }
+            // Actions were already executed by the server mid-stream; just report the outcome
+            for (const result of actionResults) {
+                const label = result.action === 'create_goal' ? 'Goal created' : 'Transaction added';
+                addMessage(result.status === 'ok'
+                    ? { role: 'assistant', content: `✅ ${label} successfully!`, created_at: new Date().toISOString() }
+                    : { role: 'assistant', content: '❌ Failed to execute the requested action: ' + result.error, created_at: new Date().toISOString() });
             }
 
             // Refresh sessions to update timestamp/order